@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Time the dep to component lookup of the CTS deps analysis.
+
+eg: python3 benchmarks/cts_path_index_benchmark.py --dirs 10000 --labels 100000
+Synthetic component dirs and gn labels are looked up with PathIndex, and
+with the check_path scan CTS used before for --legacy-labels of them.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hb_internal.cts.common import check_path  # noqa: E402
+from hb_internal.cts.common import PathIndex  # noqa: E402
+
+
+def gen_fields(dir_count):
+    fields = {}
+    for index in range(dir_count):
+        path = (f'subsystem{index % 64}/part{index // 64 % 128}/'
+                f'component{index}/module{index % 3}')
+        fields[path] = f'component{index}'
+    return fields
+
+
+def gen_labels(fields, label_count):
+    paths = list(fields)
+    labels = []
+    for index in range(label_count):
+        path = paths[random.randrange(len(paths))]
+        kind = index % 4
+        if kind == 0:
+            labels.append(f'{path}:target{index}')
+        elif kind == 1:
+            labels.append(f'{path}/src/impl:target{index}')
+        elif kind == 2:
+            labels.append(f'{path}/include/')
+        else:
+            labels.append(f'third_party/lib{index % 500}:lib{index % 500}')
+    return labels
+
+
+def lookup_legacy(fields, dep):
+    for path, cname in fields.items():
+        if check_path(dep, path):
+            return cname
+    return None
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dirs', type=int, default=10000)
+    parser.add_argument('--labels', type=int, default=100000)
+    parser.add_argument('--legacy-labels', type=int, default=200,
+                        help='labels looked up by the check_path scan, '
+                        '0 to skip it')
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+    fields = gen_fields(args.dirs)
+    labels = gen_labels(fields, args.labels)
+
+    start = time.perf_counter()
+    index = PathIndex(fields)
+    build_cost = time.perf_counter() - start
+    start = time.perf_counter()
+    results = [index.lookup(label) for label in labels]
+    cost = time.perf_counter() - start
+    print(f'path index: {args.dirs} dirs indexed in {build_cost:.3f}s, '
+          f'{len(labels)} labels in {cost:.3f}s '
+          f'({cost / len(labels) * 1e6:.2f}us each)')
+
+    if args.legacy_labels:
+        sample = labels[:args.legacy_labels]
+        start = time.perf_counter()
+        legacy = [lookup_legacy(fields, label) for label in sample]
+        legacy_cost = time.perf_counter() - start
+        each = legacy_cost / len(sample)
+        print(f'check_path: {len(sample)} labels in {legacy_cost:.3f}s '
+              f'({each * 1e6:.2f}us each, '
+              f'{each * len(labels):.1f}s for {len(labels)})')
+        mismatches = sum(1 for result, legacy_result in zip(results, legacy)
+                         if result != legacy_result)
+        if mismatches:
+            print(f'{mismatches} labels resolved differently')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Time the startup of hb/__entry__.py and fail above a budget.
+
+eg: python3 benchmarks/hb_startup_benchmark.py --budget-ms 100 -- -v
+The command runs the way hb/__main__.py execs it, from a scratch source
+root whose build/lite links to this repository. Exits 1 when the median
+run takes longer than --budget-ms.
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+import subprocess
+
+LITE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LITE_DIR)
+from hb.__main__ import EXECV_FRAGMENT  # noqa: E402
+
+
+def run_cmd(cmd, cwd):
+    env = dict(os.environ)
+    env.pop('HB_TOP_DIR', None)
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def run_hb(top_dir, hb_args):
+    return run_cmd([sys.executable, '-c', EXECV_FRAGMENT] + hb_args +
+                   [os.path.join(top_dir, 'build/lite/hb')], top_dir)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=100)
+    parser.add_argument('hb_args', nargs='*', default=['-v'],
+                        help='hb arguments, default: -v')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as top_dir:
+        os.makedirs(os.path.join(top_dir, 'build'))
+        os.symlink(LITE_DIR, os.path.join(top_dir, 'build/lite'))
+        # The bare interpreter startup, for reference on slow machines.
+        python_ms = statistics.median(
+            run_cmd([sys.executable, '-c', 'pass'], top_dir)
+            for _ in range(args.runs)) * 1000
+        costs = [run_hb(top_dir, args.hb_args) for _ in range(args.runs)]
+
+    median_ms = statistics.median(costs) * 1000
+    print(f'hb {" ".join(args.hb_args)}: median {median_ms:.1f}ms, '
+          f'min {min(costs) * 1000:.1f}ms over {args.runs} runs '
+          f'(python3 alone {python_ms:.1f}ms, budget {args.budget_ms:.0f}ms)')
+    return 0 if median_ms <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Replay a recorded ninja log through exec_command's log pump.
+
+eg: python3 benchmarks/log_pump_benchmark.py --ninja-log out/rk3568/build.log
+Without --ninja-log a synthetic log of --size-mb megabytes is generated.
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hb_internal.common.log_pump import LogPump  # noqa: E402
+
+
+class NullConsole():
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+def gen_ninja_log(path, size_mb):
+    line = ('[{0}/{1}] CXX obj/foundation/arkui/ace_engine/frameworks/core/'
+            'components/{0}/render_component_{0}.o\n')
+    total = size_mb * 1024 * 1024 // len(line.format(0, 0))
+    with open(path, 'wt', encoding='utf-8') as log_file:
+        for index in range(1, total + 1):
+            log_file.write(line.format(index, total))
+
+
+def replay_pump(ninja_log, build_log, log_filter):
+    with open(build_log, 'ab') as log_file:
+        process = subprocess.Popen(['cat', ninja_log],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        pump = LogPump(process.stdout, log_file, log_filter=log_filter,
+                       console=NullConsole())
+        pump.run()
+    process.wait()
+
+
+def replay_readline(ninja_log, build_log, log_filter):
+    # The line based loop exec_command used before the log pump.
+    pattern = re.compile(r'\[\d+/\d+\].+')
+    console = NullConsole()
+    with open(build_log, 'at', encoding='utf-8') as log_file:
+        process = subprocess.Popen(['cat', ninja_log],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT,
+                                   encoding='utf-8')
+        for line in iter(process.stdout.readline, ''):
+            if log_filter:
+                info = re.findall(pattern, line)
+                if len(info):
+                    console.write(info[0])
+                    console.flush()
+            else:
+                console.write(line)
+                console.flush()
+            log_file.write(line)
+    process.wait()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ninja-log', help='recorded ninja output to replay')
+    parser.add_argument('--size-mb', type=int, default=300)
+    parser.add_argument('--no-filter', action='store_true')
+    parser.add_argument('--legacy', action='store_true',
+                        help='also time the readline based loop')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ninja_log = args.ninja_log
+        if ninja_log is None:
+            ninja_log = os.path.join(tmp_dir, 'ninja.log')
+            gen_ninja_log(ninja_log, args.size_mb)
+        size_mb = os.path.getsize(ninja_log) / 1024 / 1024
+
+        runners = [('log pump', replay_pump)]
+        if args.legacy:
+            runners.append(('readline', replay_readline))
+        for name, runner in runners:
+            build_log = os.path.join(tmp_dir, f'{name}.log')
+            start = time.perf_counter()
+            runner(ninja_log, build_log, not args.no_filter)
+            cost = time.perf_counter() - start
+            print(f'{name}: {size_mb:.1f}MB in {cost:.2f}s '
+                  f'({size_mb / cost:.1f}MB/s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import argparse
+import os
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Write the version info of the image.')
+    parser.add_argument('--version', required=True)
+    parser.add_argument(
+        '--build-time',
+        help='Build time used when there is no build time file.',
+        default='')
+    parser.add_argument(
+        '--build-time-file',
+        help='File holding the build time written by hb.',
+        required=True)
+    parser.add_argument('--output', required=True)
+    parser.add_argument(
+        '--depfile',
+        help='Depfile listing the build time file, even a missing one.')
+
+    args = parser.parse_args()
+
+    build_time = args.build_time
+    if os.path.isfile(args.build_time_file):
+        with open(args.build_time_file, 'rt', encoding='utf-8') as time_file:
+            build_time = time_file.read().strip()
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'wt', encoding='utf-8') as output_file:
+        output_file.write(f'VERSION="{args.version}"\n')
+        output_file.write(f'BUILD_TIME="{build_time}"\n')
+
+    if args.depfile:
+        # ninja treats a missing depfile input as dirty, not as an error.
+        os.makedirs(os.path.dirname(args.depfile) or '.', exist_ok=True)
+        with open(args.depfile, 'wt', encoding='utf-8') as depfile:
+            depfile.write(f'{args.output}: {args.build_time_file}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,16 +26,40 @@ import traceback
 VERSION = "0.4.6"
 
 
+# Source root found by hb/__main__.py or a previous lookup.
+TOP_DIR_ENV = 'HB_TOP_DIR'
+
+
 def find_top():
     cur_dir = os.getcwd()
+    # The cached root only ends the walk early: it is used when cwd is
+    # under it and no nearer root, eg: of a nested checkout, is found on
+    # the way up. From anywhere else the walk goes on as without it.
+    top_dir = os.environ.get(TOP_DIR_ENV)
+    if top_dir:
+        top_dir = os.path.realpath(top_dir)
+        if cur_dir != top_dir and not cur_dir.startswith(top_dir + os.sep):
+            top_dir = None
     while cur_dir != "/":
+        if cur_dir == top_dir and os.path.exists(
+                os.path.join(top_dir, 'build/lite/hb_internal')):
+            return top_dir
         hb_internal = os.path.join(cur_dir, 'build/lite/hb_internal')
         if os.path.exists(hb_internal):
+            os.environ[TOP_DIR_ENV] = cur_dir
             return cur_dir
         cur_dir = os.path.dirname(cur_dir)
     raise Exception("Please call hb utilities inside source root directory")
 
 
+def get_command_name(argv, command_set):
+    # The first positional argument selects the subcommand.
+    for arg in argv:
+        if not arg.startswith('-'):
+            return arg if arg in command_set else None
+    return None
+
+
 def get_hb_commands(config_file):
     if not os.path.exists(config_file):
         raise Exception('Error: {} not exist, couldnot get hb command set'.format(config_file))
@@ -64,9 +88,14 @@ def main():
     for key, val in command_set.items():
         parser_list.append({'name': key, 'help': val})
 
+    # Only the module of the selected subcommand is imported, the
+    # others are registered with their help text alone.
+    command_name = get_command_name(sys.argv[1:], command_set)
     for each in parser_list:
         module_parser = subparsers.add_parser(name=each.get('name'),
                                               help=each.get('help'))
+        if each.get('name') != command_name:
+            continue
         module = importlib.import_module('hb_internal.{0}.{0}'.format(
             each.get('name')))
         module.add_options(module_parser)
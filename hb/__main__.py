@@ -18,6 +18,7 @@
 
 import os
 import sys
+import json
 
 
 VERSION = "0.4.6"
@@ -32,11 +33,29 @@ sys.exit(entry.main())
 """
 
 
+# Source root, exported for __entry__.py so it need not look again.
+TOP_DIR_ENV = "HB_TOP_DIR"
+# Directories of python3 and __entry__.py found by a previous run.
+STARTUP_CACHE = "out/.hb_startup_cache.json"
+
+
 def find_top():
     cur_dir = os.getcwd()
+    # The cached root only ends the walk early: it is used when cwd is
+    # under it and no nearer root, eg: of a nested checkout, is found on
+    # the way up. From anywhere else the walk goes on as without it.
+    top_dir = os.environ.get(TOP_DIR_ENV)
+    if top_dir:
+        top_dir = os.path.realpath(top_dir)
+        if cur_dir != top_dir and not cur_dir.startswith(top_dir + os.sep):
+            top_dir = None
     while cur_dir != "/":
+        if cur_dir == top_dir and os.path.exists(
+                os.path.join(top_dir, 'build/lite/hb_internal')):
+            return top_dir
         hb_internal = os.path.join(cur_dir, 'build/lite/hb_internal')
         if os.path.exists(hb_internal):
+            os.environ[TOP_DIR_ENV] = cur_dir
             return cur_dir
         cur_dir = os.path.dirname(cur_dir)
     raise Exception("Please call hb utilities inside source root directory")
@@ -49,6 +68,36 @@ def search(findir, target):
     return False
 
 
+def get_startup_dirs(topdir, python_base_dir):
+    """Return the python3 and __entry__.py directories.
+
+    Walking prebuilts/python and build/lite takes longer than the rest
+    of the startup, so the result is kept in a marker file as long as
+    both files are still there.
+    """
+    cache_file = os.path.join(topdir, STARTUP_CACHE)
+    try:
+        with open(cache_file, 'r') as cache:
+            python_dir, hb_dir = json.load(cache)
+        if os.path.isfile(os.path.join(python_dir, 'python3')) and \
+                os.path.isfile(os.path.join(hb_dir, '__entry__.py')):
+            return python_dir, hb_dir
+    except (OSError, ValueError, TypeError):
+        pass
+
+    python_dir = search(python_base_dir, 'python3')
+    if not python_dir:
+        raise Exception(f"{python_base_dir}/python3 does not exist. please execute build/prebuilts_download.sh")
+    hb_dir = search(os.path.join(topdir, 'build/lite'), '__entry__.py')
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'w') as cache:
+            json.dump([python_dir, hb_dir], cache)
+    except OSError:
+        pass
+    return python_dir, hb_dir
+
+
 def main():
     try:
         topdir = find_top()
@@ -56,12 +105,8 @@ def main():
         return print("hb_error: Please call hb utilities inside source root directory")
     python_base_dir = os.path.join(topdir, 'prebuilts/python')
     if os.path.exists(python_base_dir):
-        python_dir = search(python_base_dir, 'python3')
-        if not python_dir:
-            raise Exception(f"{python_base_dir}/python3 does not exist. please execute build/prebuilts_download.sh")
+        python_dir, hb_dir = get_startup_dirs(topdir, python_base_dir)
         python_executable = os.path.join(python_dir, 'python3')
-        lite_dir = os.path.join(topdir, 'build/lite')
-        hb_dir = search(lite_dir, '__entry__.py')
         param_list = ["python3", "-c", EXECV_FRAGMENT]
         for arg in sys.argv[1:]:
             param_list.append(arg)
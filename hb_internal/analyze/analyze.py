@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+
+from hb_internal.common.config import Config
+from hb_internal.common.utils import OHOSException
+from hb_internal.build.critical_path import analyze_build
+
+
+def add_options(parser):
+    parser.add_argument('--out-path',
+                        nargs=1,
+                        default=None,
+                        help='specify the build directory, '
+                        'eg: hb analyze --out-path out/rk3568')
+    parser.add_argument('--top',
+                        type=int,
+                        default=20,
+                        help='number of serializing actions to list')
+    parser.add_argument('--no-graph',
+                        action='store_true',
+                        default=False,
+                        help='estimate the critical path from .ninja_log '
+                        'timing only, without running ninja -t graph')
+    parser.add_argument('targets',
+                        nargs='*',
+                        default=[],
+                        help='targets the graph is restricted to')
+
+
+def exec_command(args):
+    config = Config()
+    out_path = args.out_path[0] if args.out_path else config.out_path
+    if out_path is None or not os.path.isdir(out_path):
+        raise OHOSException(f'{out_path} is not a build directory')
+    if config.os_level == 'standard':
+        ninja_path = 'ninja'
+    else:
+        ninja_path = config.ninja_path
+    analyze_build(out_path,
+                  ninja_path=ninja_path,
+                  targets=args.targets,
+                  top=args.top,
+                  use_graph=not args.no_graph)
+    return 0
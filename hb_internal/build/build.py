@@ -20,6 +20,8 @@ import os
 import sys
 from collections import defaultdict
 from hb_internal.build.build_process import Build
+from hb_internal.build.multi_product_build import MultiProductBuild
+from hb_internal.build.ninja_jobs import auto_ninja_jobs
 from hb_internal.set.set import set_product
 from hb_internal.common.utils import get_current_time
 from hb_internal.common.utils import OHOSException
@@ -61,6 +63,11 @@ def add_options(parser):
                         'with {product_name}@{company}',
                         nargs=1,
                         default=[])
+    parser.add_argument('--products',
+                        default=None,
+                        help='build several products at the same time, '
+                        'eg: --products ipcamera_hispark_taurus@hisilicon,'
+                        'wifiiot_hispark_pegasus@hisilicon')
     parser.add_argument('-f',
                         '--full',
                         help='full code compilation',
@@ -118,6 +125,12 @@ def add_options(parser):
                         default=False,
                         help='it will skip package image process'
                         'you can enable it if you do not need package image')
+    parser.add_argument('--image-compressor',
+                        choices=['gzip', 'zstd'],
+                        default='gzip',
+                        help='compressor of the packaged images, gzip writes '
+                        'images.tar.gz, zstd writes images.tar.zst and needs '
+                        'the python zstandard package')
     parser.add_argument('--disable-post-build',
                         action='store_true',
                         default=False,
@@ -137,6 +150,29 @@ def add_options(parser):
     parser.add_argument('--build-variant',
                         help='specifies device operating mode',
                         default='root')
+    parser.add_argument('-j',
+                        '--jobs',
+                        default=None,
+                        help='number of jobs ninja runs, or "auto" to derive '
+                        'ninja -j and -l from the cores and free memory, '
+                        'for mini/small auto also limits concurrent links '
+                        'to what the memory holds')
+    parser.add_argument('--events',
+                        default=None,
+                        help='write build events (progress, phases and '
+                        'post build steps) as json lines to the given file, '
+                        'eg: --events out/build_events.jsonl')
+    parser.add_argument('--critical-path',
+                        action='store_true',
+                        default=False,
+                        help='report the critical path, parallelism and '
+                        'serializing actions after ninja finishes, '
+                        'see also "hb analyze"')
+    parser.add_argument('--profile',
+                        action='store_true',
+                        default=False,
+                        help='profile hb itself with cProfile and tracemalloc, '
+                        'reports are written to the out directory')
     parser.add_argument('--share-ccache',
                         default="",
                         help='It is customized path to place ccache, which allow'
@@ -144,6 +180,9 @@ def add_options(parser):
 
 
 def exec_command(args):
+    if args.products:
+        return exec_products(args)
+
     if len(args.product):
         if '@' in args.product[0]:
             product, company = args.product[0].split('@')
@@ -152,7 +191,24 @@ def exec_command(args):
             company = None
         set_product(product_name=product, company=company)
 
-    build = Build(args.component, args.compact_mode)
+    build, cmd_args, ninja = prepare_build(args)
+    return build.build(args.full,
+                       patch=args.patch,
+                       cmd_args=cmd_args,
+                       ninja=ninja)
+
+
+def exec_products(args):
+    if len(args.product):
+        raise OHOSException('--product and --products can not be combined')
+    multi_build = MultiProductBuild(
+        args.products, lambda config: prepare_build(args, config))
+    return multi_build.run(args.full, patch=args.patch)
+
+
+def prepare_build(args, config=None):
+    """Return the Build, its cmd_args and whether to run ninja."""
+    build = Build(args.component, args.compact_mode, config)
     cmd_args = defaultdict()
     cmd_args['gn'] = []
     cmd_args['ninja'] = {}
@@ -212,6 +268,16 @@ def exec_command(args):
             cmd_args['ninja']['targets'] = ['make_all', 'make_test']
     if hasattr(args, 'keep_ninja_going') and args.keep_ninja_going:
         cmd_args['ninja']['keep_ninja_going'] = True
+    if hasattr(args, 'jobs') and args.jobs == 'auto':
+        jobs, load = auto_ninja_jobs()
+        cmd_args['ninja']['jobs'] = jobs
+        cmd_args['ninja']['load'] = load
+        cmd_args['ninja']['link_pool'] = True
+    elif hasattr(args, 'jobs') and args.jobs:
+        try:
+            cmd_args['ninja']['jobs'] = int(args.jobs)
+        except ValueError:
+            raise OHOSException(f'Invalid jobs: {args.jobs}')
     if hasattr(args, 'log_level') and args.log_level: 
         cmd_args['log_level'] = args.log_level
 
@@ -224,6 +290,8 @@ def exec_command(args):
         cmd_args['export_rust_project'] = args.export_rust_project
     if args.disable_package_image:
         cmd_args['disable_package_image'] = args.disable_package_image
+    if hasattr(args, 'image_compressor') and args.image_compressor:
+        cmd_args['image_compressor'] = args.image_compressor
     if args.disable_post_build:
         cmd_args['disable_post_build'] = args.disable_post_build
     if args.disable_part_of_post_build:
@@ -232,9 +300,12 @@ def exec_command(args):
         cmd_args['device_type'] = args.device_type
     if hasattr(args, 'build_variant') and args.build_variant:
         cmd_args['build_variant'] = args.build_variant
+    if hasattr(args, 'events') and args.events:
+        cmd_args['events'] = args.events
+    if hasattr(args, 'critical_path') and args.critical_path:
+        cmd_args['critical_path'] = args.critical_path
+    if hasattr(args, 'profile') and args.profile:
+        cmd_args['profile'] = args.profile
     if hasattr(args, 'share_ccache') and args.share_ccache:
         build.register_args('share_ccache', args.share_ccache)
-    return build.build(args.full,
-                       patch=args.patch,
-                       cmd_args=cmd_args,
-                       ninja=ninja)
+    return build, cmd_args, ninja
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import sqlite3
+import statistics
+
+from hb_internal.build.ninja_log import read_ninja_log
+from hb_internal.build.part_rom_statistics import check_image_size
+
+HISTORY_DB = 'hb_history.db'
+# Builds kept per product, older ones are dropped when recording.
+HISTORY_RETENTION = 30
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT,
+    out_path TEXT,
+    start_time REAL,
+    total_time REAL,
+    status TEXT,
+    ccache_hit_rate REAL
+);
+CREATE TABLE IF NOT EXISTS phases (
+    build_id INTEGER,
+    name TEXT,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS actions (
+    build_id INTEGER,
+    output TEXT,
+    duration_ms INTEGER
+);
+CREATE TABLE IF NOT EXISTS images (
+    build_id INTEGER,
+    name TEXT,
+    size_kb REAL
+);
+CREATE TABLE IF NOT EXISTS ccache_dirs (
+    build_id INTEGER,
+    directory TEXT,
+    hits INTEGER,
+    misses INTEGER,
+    uncacheable INTEGER
+);
+CREATE TABLE IF NOT EXISTS ccache_reasons (
+    build_id INTEGER,
+    reason TEXT,
+    count INTEGER
+);
+CREATE INDEX IF NOT EXISTS phases_build ON phases (build_id);
+CREATE INDEX IF NOT EXISTS actions_build ON actions (build_id);
+CREATE INDEX IF NOT EXISTS images_build ON images (build_id);
+CREATE INDEX IF NOT EXISTS ccache_dirs_build ON ccache_dirs (build_id);
+CREATE INDEX IF NOT EXISTS ccache_reasons_build ON ccache_reasons (build_id);
+'''
+
+
+def get_history_db(root_path):
+    # out/ survives "hb build -f", which only removes out/<board>.
+    return os.path.join(root_path, 'out', HISTORY_DB)
+
+
+def read_build_actions(ninja_log, ninja_start_time):
+    """Return the actions ninja ran in the build started at
+    ninja_start_time (epoch seconds).
+
+    .ninja_log is left alone by a build which ran no edge, or did not
+    run ninja at all, its last actions then belong to an earlier build.
+    """
+    try:
+        log_mtime = os.path.getmtime(ninja_log)
+    except OSError:
+        return []
+    if log_mtime < ninja_start_time:
+        return []
+    # Every action of this build finished before ninja last wrote the
+    # log, allow for the coarse timestamps of some file systems.
+    last_end = (log_mtime - ninja_start_time + 1) * 1000
+    return [action for action in read_ninja_log(ninja_log)
+            if action.end <= last_end]
+
+
+class BuildHistory():
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def record(self, product, out_path, start_time, total_time, status,
+               phase_times, ccache_stats=None, ninja_start_time=None):
+        """Store one build and return its id.
+
+        ccache_stats are the stats collect_ccache_stats() parsed from the
+        ccache log of the build. Actions are only recorded when ninja ran
+        edges after ninja_start_time, which defaults to start_time.
+        """
+        ccache_hit_rate = ccache_stats.get('hit_rate') \
+            if ccache_stats else None
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO builds (product, out_path, start_time, '
+                'total_time, status, ccache_hit_rate) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (product, out_path, start_time, total_time, status,
+                 ccache_hit_rate))
+            build_id = cursor.lastrowid
+
+            phases = [(build_id, phase['phase'], phase['duration'])
+                      for phase in phase_times]
+            post_build = [phase for phase in phase_times
+                          if phase['phase'].startswith('PostBuild.')]
+            if post_build:
+                # The steps run concurrently, PostBuild is their wall time.
+                phases.append((
+                    build_id, 'PostBuild',
+                    max(phase['start'] + phase['duration']
+                        for phase in post_build) -
+                    min(phase['start'] for phase in post_build)))
+            self._conn.executemany('INSERT INTO phases VALUES (?, ?, ?)',
+                                   phases)
+
+            self._conn.executemany(
+                'INSERT INTO actions VALUES (?, ?, ?)',
+                ((build_id, action.outputs[0], action.end - action.start)
+                 for action in read_build_actions(
+                     os.path.join(out_path, '.ninja_log'),
+                     start_time if ninja_start_time is None
+                     else ninja_start_time)))
+
+            self._conn.executemany(
+                'INSERT INTO images VALUES (?, ?, ?)',
+                ((build_id, image['img_name'],
+                  float(re.sub(r'KB$', '', image['img_size'])))
+                 for image in check_image_size(out_path)))
+            if ccache_stats:
+                self._conn.executemany(
+                    'INSERT INTO ccache_dirs VALUES (?, ?, ?, ?, ?)',
+                    ((build_id, directory, counts.get('hits', 0),
+                      counts.get('misses', 0), counts.get('uncacheable', 0))
+                     for directory, counts in
+                     ccache_stats['directories'].items()))
+                self._conn.executemany(
+                    'INSERT INTO ccache_reasons VALUES (?, ?, ?)',
+                    ((build_id, reason, count) for reason, count in
+                     ccache_stats['reasons'].items()))
+            self._expire(product)
+        return build_id
+
+    def _expire(self, product):
+        expired = [row[0] for row in self._conn.execute(
+            'SELECT id FROM builds WHERE product = ? '
+            'ORDER BY id DESC LIMIT -1 OFFSET ?',
+            (product, HISTORY_RETENTION))]
+        for table, column in (('phases', 'build_id'),
+                              ('actions', 'build_id'),
+                              ('images', 'build_id'),
+                              ('ccache_dirs', 'build_id'),
+                              ('ccache_reasons', 'build_id'),
+                              ('builds', 'id')):
+            self._conn.executemany(
+                f'DELETE FROM {table} WHERE {column} = ?',
+                ((build_id, ) for build_id in expired))
+
+    def get_builds(self, product=None, limit=10):
+        query = 'SELECT id, product, start_time, total_time, status, ' \
+                'ccache_hit_rate FROM builds'
+        params = []
+        if product is not None:
+            query += ' WHERE product = ?'
+            params.append(product)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        return self._conn.execute(query, params).fetchall()
+
+    def get_regressions(self, build_id=None, window=5, threshold=0.2,
+                        min_delta=1.0):
+        """Compare a build against the median of the builds before it.
+
+        Returns (kind, name, current, baseline) rows for phases, actions
+        and images which grew by more than threshold (a ratio) and by at
+        least min_delta (seconds, or KB for images).
+        """
+        if build_id is None:
+            row = self._conn.execute(
+                'SELECT id FROM builds ORDER BY id DESC LIMIT 1').fetchone()
+            if row is None:
+                return []
+            build_id = row[0]
+        row = self._conn.execute('SELECT product FROM builds WHERE id = ?',
+                                 (build_id, )).fetchone()
+        if row is None:
+            return []
+        baseline_ids = [item[0] for item in self._conn.execute(
+            'SELECT id FROM builds WHERE product = ? AND id < ? AND '
+            "status = 'success' ORDER BY id DESC LIMIT ?",
+            (row[0], build_id, window))]
+        if not baseline_ids:
+            return []
+
+        regressions = []
+        for kind, query, scale in (
+                ('phase', 'SELECT name, duration FROM phases', 1),
+                ('action', 'SELECT output, duration_ms FROM actions', 1000),
+                ('image', 'SELECT name, size_kb FROM images', 1)):
+            current = dict(self._conn.execute(
+                f'{query} WHERE build_id = ?', (build_id, )))
+            history = {}
+            marks = ','.join('?' * len(baseline_ids))
+            for name, value in self._conn.execute(
+                    f'{query} WHERE build_id IN ({marks})', baseline_ids):
+                if name in current:
+                    history.setdefault(name, []).append(value)
+            for name, values in history.items():
+                baseline = statistics.median(values)
+                value = current[name]
+                if (value - baseline) / scale >= min_delta and \
+                        value > baseline * (1 + threshold):
+                    regressions.append((kind, name, value / scale,
+                                        baseline / scale))
+        regressions.sort(key=lambda item: item[3] - item[2])
+        return regressions
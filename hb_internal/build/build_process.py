@@ -18,7 +18,11 @@
 
 import os
 import sys
+import json
+import time
+import sqlite3
 import platform
+from functools import partial
 from collections import defaultdict
 from distutils.spawn import find_executable
 
@@ -30,6 +34,8 @@ from hb_internal.common.utils import hb_warning
 from hb_internal.common.utils import OHOSException
 from hb_internal.common.utils import get_current_time
 from hb_internal.common.config import Config
+from hb_internal.common.build_events import EventSink
+from hb_internal.common.profiler import Profiler
 from hb_internal.cts.cts import CTS
 from hb_internal.common.device import Device
 from hb_internal.common.product import Product
@@ -37,12 +43,26 @@ from hb_internal.build.patch_process import Patch
 from hb_internal.preloader.preloader import Preloader
 from hb_internal.common.misc import PreBuild
 from hb_internal.common.misc import PostBuild
+from hb_internal.common.step_graph import StepGraph
+from hb_internal.common.warning_collector import WarningCollector
 from hb_internal.build.part_rom_statistics import output_part_rom_status
+from hb_internal.build.critical_path import analyze_build
+from hb_internal.build.gn_stamp import GnStamp
+from hb_internal.build.gn_stamp import format_gn_args
+from hb_internal.build.gn_stamp import write_gn_args
+from hb_internal.build.gn_stamp import write_build_time
+from hb_internal.build.ninja_jobs import link_pool_depth
+from hb_internal.build.ninja_jobs import children_peak_rss
+from hb_internal.build.ninja_jobs import record_peak_child_rss
+from hb_internal.build.build_history import BuildHistory
+from hb_internal.build.build_history import get_history_db
+from hb_internal.build.ccache_log import read_ccache_stats
+from hb_internal.build.ccache_log import clear_ccache_log_mark
 
 
 class Build():
-    def __init__(self, component=None, compact_mode=False):
-        self.config = Config()
+    def __init__(self, component=None, compact_mode=False, config=None):
+        self.config = config if config is not None else Config()
 
         # Get gn args ready
         self._args_list = []
@@ -50,9 +70,15 @@ class Build():
         self._compiler = None
         self._test = None
         self._compact_mode = compact_mode
+        self.event_sink = EventSink()
+        # Environment of the build commands, os.environ is left alone as
+        # several builds may run in one process.
+        self._env = None
 
         self.target = component
         self.start_time = get_current_time()
+        # epoch seconds, ninja_build resets it when ninja really starts.
+        self.ninja_start_time = time.time()
         self.check_in_device()
 
     @property
@@ -130,10 +156,11 @@ class Build():
             self.config.fs_attr = None
 
     def build(self, full_compile, patch=False, ninja=True, cmd_args=None):
-        if 'target_cpu' in str(cmd_args):
-            self.config.target_cpu = cmd_args["target_cpu"]
-        if 'compile_config' in str(cmd_args):
-            self.config.compile_config = cmd_args["compile_config"]
+        with self.config.transaction():
+            if 'target_cpu' in str(cmd_args):
+                self.config.target_cpu = cmd_args["target_cpu"]
+            if 'compile_config' in str(cmd_args):
+                self.config.compile_config = cmd_args["compile_config"]
         cmd_list = self.get_cmd(full_compile, patch, ninja, cmd_args)
 
         # enable ccache if it installed.
@@ -148,43 +175,119 @@ class Build():
             disable_post_build_args = cmd_args['disable_part_of_post_build']
         else:
             disable_post_build_args = []
+        self.event_sink = EventSink(cmd_args.get('events'))
+        profiler = Profiler()
+        if cmd_args.get('profile'):
+            profiler.start()
+        status = 'failed'
+        # set_ccache marks the ccache log again when it runs in this build.
+        clear_ccache_log_mark(self.config.out_path)
         try:
             for exec_cmd in cmd_list:
-                exec_cmd(cmd_args)
+                with self.event_sink.phase(exec_cmd.__qualname__):
+                    exec_cmd(cmd_args)
         except OHOSException:
             raise
         except Exception:
             raise
         else:
-            if not cmd_args.get('disable_post_build'):
-                post_build = PostBuild(self.config)
-                if not cmd_args.get('disable_package_image'):
-                    post_build.package_image()
-                if not disable_post_build_args or 'output_part_rom_status' not in disable_post_build_args:
-                    output_part_rom_status(self.config.root_path)
-
-                if self.config.os_level == "standard" and (not disable_post_build_args or 'deps_guard' not in disable_post_build_args):
-                    sys.path.append(os.path.join(self.config.root_path, "developtools/integration_verification/tools/deps_guard"))
-                    from deps_guard import deps_guard
-                    deps_guard(self.config.out_path)
+            status = 'success'
         finally:
-            if not cmd_args.get('disable_post_build'):
-                if 'post_build' not in locals():
-                    post_build = PostBuild(self.config)
-                post_build.clean(self.start_time, disable_post_build_args)
-
+            post_build_failed = self.post_build(status, ninja, cmd_args,
+                                                disable_post_build_args)
+            self.write_phase_times(status)
+            profiler.stop(self.config.out_path)
+            self.event_sink.close()
+            if ninja:
+                self.record_history(status)
+
+        if post_build_failed:
+            raise OHOSException(
+                f'post build failed: {", ".join(post_build_failed)}')
         hb_info(f'{os.path.basename(self.config.out_path)} build success')
         hb_info(f'cost time: {self.build_time}')
         return 0
 
+    def post_build(self, status, ninja, cmd_args, disable_post_build_args):
+        """Run the post build steps concurrently, return the failed ones.
+
+        Steps reading the build results only run after a successful build,
+        the others clean up after any build.
+        """
+        graph = StepGraph(self.event_sink)
+        if status == 'success' and ninja and cmd_args.get('critical_path'):
+            graph.add('PostBuild.critical_path',
+                      partial(analyze_build, self.config.out_path,
+                              ninja_path=self.ninja_path, env=self.env()))
+        if not cmd_args.get('disable_post_build'):
+            post_build = PostBuild(self.config, self.event_sink)
+            if status == 'success':
+                if not cmd_args.get('disable_package_image'):
+                    graph.add('PostBuild.package_image',
+                              post_build.step(
+                                  'package_image', post_build.package_image,
+                                  cmd_args.get('image_compressor', 'gzip')))
+                if 'output_part_rom_status' not in disable_post_build_args:
+                    graph.add('PostBuild.output_part_rom_status',
+                              partial(output_part_rom_status,
+                                      self.config.root_path, self.config))
+                if self.config.os_level == "standard" and \
+                        'deps_guard' not in disable_post_build_args:
+                    graph.add('PostBuild.deps_guard', self.deps_guard)
+            post_build.add_clean_steps(graph, self.ninja_start_time,
+                                       disable_post_build_args)
+        return graph.run()
+
+    def deps_guard(self):
+        sys.path.append(os.path.join(
+            self.config.root_path,
+            "developtools/integration_verification/tools/deps_guard"))
+        from deps_guard import deps_guard
+        deps_guard(self.config.out_path)
+
+    def write_phase_times(self, status):
+        phase_times = {
+            'product': self.config.product,
+            'status': status,
+            'total': round(self.event_sink.now(), 6),
+            'phases': [dict(phase,
+                            start=round(phase['start'], 6),
+                            duration=round(phase['duration'], 6))
+                       for phase in self.event_sink.phase_times],
+        }
+        makedirs(self.config.out_path, exist_ok=True)
+        with open(os.path.join(self.config.out_path, 'hb_phase_times.json'),
+                  'wt', encoding='utf-8') as phase_file:
+            json.dump(phase_times, phase_file, indent=2)
+        for phase in self.event_sink.phase_times:
+            hb_info(f'{phase["phase"]}: {phase["duration"]:.3f}s')
+
+    def record_history(self, status):
+        try:
+            history = BuildHistory(get_history_db(self.config.root_path))
+            try:
+                history.record(self.config.product,
+                               self.config.out_path,
+                               self.start_time.timestamp(),
+                               self.build_time.total_seconds(),
+                               status,
+                               self.event_sink.phase_times,
+                               read_ccache_stats(self.config.out_path),
+                               self.ninja_start_time)
+            finally:
+                history.close()
+        except (sqlite3.Error, OSError) as exception:
+            hb_warning(f'failed to record build history: {exception}')
+
     def get_cmd(self, full_compile, patch, ninja, cmd_args):
         cmd_list = []
         if not cmd_args.get('fast_rebuild'):
-            pre_build = PreBuild(self.config)
+            pre_build = PreBuild(self.config, self.env(),
+                                 cmd_args.get('ccache_log_suffix'))
             cmd_list.append(pre_build.prepare)
 
         if patch:
-            patch = Patch()
+            patch = Patch(self.config)
             cmd_list.append(patch.patch_make)
 
         if not cmd_args.get('fast_rebuild'):
@@ -214,18 +317,22 @@ class Build():
         return cmd_list
 
     def env(self):
+        if self._env is not None:
+            return self._env
+        env = dict(os.environ)
         system = platform.system().lower()
         if self.config.os_level == 'standard':
-            path = os.environ.get('PATH')
+            path = env.get('PATH')
             my_python = os.path.join(
                 self.config.root_path,
                 f'prebuilts/python/{system}-x86/3.8.5/bin')
-            os.environ['PATH'] = f'{my_python}:{path}'
-        path = os.environ.get('PATH')
+            env['PATH'] = f'{my_python}:{path}'
+        path = env.get('PATH')
         my_build_tools = os.path.join(
             self.config.root_path, f'prebuilts/build-tools/{system}-x86/bin')
-        os.environ['PATH'] = f'{my_build_tools}:{path}'
-        return os.environ
+        env['PATH'] = f'{my_build_tools}:{path}'
+        self._env = env
+        return env
 
     def gn_build(self, cmd_args):
         # Gn cmd init and execute
@@ -244,10 +351,15 @@ class Build():
             self.register_args('build_variant', cmd_args.get('build_variant'))
         if cmd_args.get('device_type'):
             self.register_args('device_type', cmd_args.get('device_type'))
+        if cmd_args.get('ninja', {}).get('link_pool') and \
+                os_level != 'standard':
+            depth = link_pool_depth()
+            if depth is not None:
+                self.register_args('ohos_link_pool_depth', depth, quota=False)
+        # Args go through args.gn, gn gen picks them up from out_path.
         gn_cmd = [
             gn_path,
             'gen',
-            '--args={}'.format(" ".join(self._args_list)),
             self.config.out_path,
         ] + gn_args
         if os_level == 'mini' or os_level == 'small':
@@ -257,16 +369,35 @@ class Build():
                 '--root={}'.format(self.config.root_path),
                 '--dotfile={}/.gn'.format(self.config.build_path),
             ])
+
+        # gn gen is skipped when neither its command line, its args nor
+        # any file it read changed since the last successful run.
+        gn_args_content = format_gn_args(self._args_list)
+        write_build_time(self.config.out_path,
+                         self.start_time.strftime('%Y-%m-%d %H:%M:%S'))
+        stamp = GnStamp(self.config.out_path,
+                        os.path.join(self.config.root_path, 'out'))
+        reason = stamp.check(gn_cmd, gn_args_content)
+        if reason is None:
+            hb_info('gn gen skipped, build files are up to date')
+            return
+        hb_info(f'run gn gen: {reason}')
+        stamp.invalidate()
+        write_gn_args(self.config.out_path, gn_args_content)
         exec_command(gn_cmd, log_path=self.config.log_path, env=self.env())
+        stamp.update(gn_cmd)
 
     def gn_clean(self, out_path=None):
         remove_path(self.config.out_path)
 
-    def ninja_build(self, cmd_args):
+    @property
+    def ninja_path(self):
         if self.config.os_level == "standard":
-            ninja_path = 'ninja'
-        else:
-            ninja_path = self.config.ninja_path
+            return 'ninja'
+        return self.config.ninja_path
+
+    def ninja_build(self, cmd_args):
+        ninja_path = self.ninja_path
 
         ninja_args = cmd_args.get('ninja', {})
         my_ninja_args = []
@@ -274,6 +405,10 @@ class Build():
             my_ninja_args.append('-v')
         if ninja_args.get('keep_ninja_going') == True:
             my_ninja_args.append('-k1000000')
+        if ninja_args.get('jobs'):
+            my_ninja_args.append(f'-j{ninja_args["jobs"]}')
+        if ninja_args.get('load'):
+            my_ninja_args.append(f'-l{ninja_args["load"]}')
 
         # Keep targets to the last
         if ninja_args.get('default_target') is not None:         
@@ -287,10 +422,27 @@ class Build():
             ninja_path, '-w', 'dupbuild=warn', '-C', self.config.out_path
         ] + my_ninja_args
 
-        exec_command(ninja_cmd,
-                     log_path=self.config.log_path,
-                     log_filter=True,
-                     env=self.env())
+        # Warnings are picked from the output while it streams, instead
+        # of reading build.log again after the build.
+        listeners = []
+        if 'get_warning_list' not in cmd_args.get(
+                'disable_part_of_post_build', []):
+            listeners.append(WarningCollector(self.config.root_path,
+                                              self.config.out_path))
+
+        self.ninja_start_time = time.time()
+        peak_rss = children_peak_rss()
+        try:
+            exec_command(ninja_cmd,
+                         log_path=self.config.log_path,
+                         log_filter=True,
+                         event_sink=self.event_sink,
+                         listeners=listeners,
+                         env=self.env())
+        finally:
+            for collector in listeners:
+                collector.write()
+        record_peak_child_rss(self.config.out_path, peak_rss)
 
     def check_in_device(self):
         if self._target is None and Device.is_in_device():
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import json
+from collections import defaultdict
+
+CCACHE_LOG_MARK = '.hb_ccache_log.json'
+CCACHE_STATS = 'ccache_stats.json'
+# ccache.log is rotated when it grows larger than this.
+CCACHE_LOG_ROTATE_SIZE = 1 << 30
+# Source directories are summed up this many path components deep.
+DIRECTORY_DEPTH = 2
+
+# eg: [2022-05-05T10:11:12.345678 12345] Result: direct_cache_hit
+LOG_LINE_PATTERN = re.compile(rb'^\[[^\]]* (\d+)\] (.*)$')
+
+
+def size_bytes(size):
+    """Convert a ccache size, eg: 100G or 1.5Gi, to bytes."""
+    match = re.match(r'^([\d.]+)\s*([kKMGT]?)(i?)B?$', size.strip())
+    if match is None:
+        return None
+    number, unit, binary = match.groups()
+    base = 1024 if binary else 1000
+    return int(float(number) * base ** ' KMGT'.index(unit.upper() or ' '))
+
+
+def configured_max_size(ccache_dir):
+    """Return max_size of ccache.conf in ccache_dir, None if not set."""
+    try:
+        with open(os.path.join(ccache_dir, 'ccache.conf'), 'rt',
+                  encoding='utf-8') as conf:
+            for line in conf:
+                name, _, value = line.partition('=')
+                if name.strip() == 'max_size':
+                    return value.strip()
+    except OSError:
+        pass
+    return None
+
+
+def clear_ccache_log_mark(out_path):
+    """Forget the ccache log range and stats of the last build.
+
+    Run at the start of every build, a build which does not set ccache up
+    has no range to parse and no stats.
+    """
+    for name in (CCACHE_LOG_MARK, CCACHE_STATS):
+        path = os.path.join(out_path, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def mark_ccache_log(log_file, out_path):
+    """Remember where the ccache log of the coming build starts."""
+    try:
+        stat = os.stat(log_file)
+        mark = {'log': log_file, 'inode': stat.st_ino,
+                'offset': stat.st_size}
+    except OSError:
+        mark = {'log': log_file, 'inode': None, 'offset': 0}
+    with open(os.path.join(out_path, CCACHE_LOG_MARK), 'wt',
+              encoding='utf-8') as mark_file:
+        json.dump(mark, mark_file)
+
+
+def read_ccache_log_mark(out_path):
+    try:
+        with open(os.path.join(out_path, CCACHE_LOG_MARK), 'rt',
+                  encoding='utf-8') as mark_file:
+            return json.load(mark_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _classify(result):
+    if 'hit' in result:
+        return 'hits'
+    if 'miss' in result:
+        return 'misses'
+    return 'uncacheable'
+
+
+class CcacheLogStats():
+    """Hit, miss and uncacheable counts of a ccache log.
+
+    Lines of concurrent ccache runs are interleaved and told apart by
+    their pid. Only the first result of a run counts, newer ccache
+    versions log more results about the storage it used.
+    """
+    def __init__(self, root_path):
+        self._root_path = root_path
+        self.totals = defaultdict(int)
+        self.reasons = defaultdict(int)
+        self.directories = defaultdict(lambda: defaultdict(int))
+        self._runs = {}
+
+    def parse(self, log_file, offset=0):
+        """Parse log_file from offset, return the offset parsed up to."""
+        with open(log_file, 'rb') as log:
+            log.seek(offset)
+            for line in log:
+                if not line.endswith(b'\n'):
+                    # Being written, the next parse starts with it.
+                    break
+                offset += len(line)
+                self._feed(line.rstrip(b'\r\n'))
+        return offset
+
+    def _feed(self, line):
+        match = LOG_LINE_PATTERN.match(line)
+        if match is None:
+            return
+        pid = match.group(1)
+        text = match.group(2).decode('utf-8', errors='replace')
+        if text.startswith('=== CCACHE') or pid not in self._runs:
+            self._runs[pid] = {'cwd': None, 'source': None, 'counted': False}
+        run = self._runs[pid]
+        name, _, value = text.partition(': ')
+        if name == 'Working directory':
+            run['cwd'] = value
+        elif name == 'Source file':
+            run['source'] = value
+        elif name == 'Result' and not run['counted']:
+            run['counted'] = True
+            kind = self._count(value, run)
+            if kind == 'uncacheable':
+                self.reasons[value] += 1
+
+    def _count(self, result, run):
+        kind = _classify(result)
+        self.totals[kind] += 1
+        directory = self._directory(run)
+        if directory is not None:
+            self.directories[directory][kind] += 1
+        return kind
+
+    def _directory(self, run):
+        source = run['source']
+        if source is None:
+            return None
+        if run['cwd'] is not None:
+            source = os.path.join(run['cwd'], source)
+        source = os.path.relpath(os.path.normpath(source), self._root_path)
+        if source.startswith(os.pardir):
+            # Outside of the source tree, eg: a prebuilt toolchain.
+            return os.pardir
+        parts = os.path.dirname(source).split(os.sep)
+        return '/'.join(parts[:DIRECTORY_DEPTH]) or '.'
+
+    def to_dict(self):
+        hits = self.totals['hits']
+        misses = self.totals['misses']
+        uncacheable = self.totals['uncacheable']
+        total = hits + misses + uncacheable
+        return {
+            'total': total,
+            'hits': hits,
+            'misses': misses,
+            'uncacheable': uncacheable,
+            # Hits among the cacheable compiles.
+            'hit_rate': round(hits / (hits + misses), 4)
+            if hits + misses else None,
+            'uncacheable_rate': round(uncacheable / total, 4)
+            if total else None,
+            'reasons': dict(sorted(self.reasons.items(),
+                                   key=lambda item: -item[1])),
+            'directories': {
+                directory: dict(counts) for directory, counts in
+                sorted(self.directories.items())
+            },
+        }
+
+
+def collect_ccache_stats(root_path, out_path):
+    """Parse the ccache log of the last build into out_path/CCACHE_STATS.
+
+    Return the stats, None when no log was marked for the build.
+    """
+    mark = read_ccache_log_mark(out_path)
+    if mark is None or not os.path.isfile(mark['log']):
+        return None
+    offset = mark['offset']
+    if os.stat(mark['log']).st_ino != mark['inode']:
+        # Rotated or created during the build.
+        offset = 0
+    stats = CcacheLogStats(root_path)
+    stats.parse(mark['log'], offset)
+    stats = stats.to_dict()
+    with open(os.path.join(out_path, CCACHE_STATS), 'wt',
+              encoding='utf-8') as stats_file:
+        json.dump(stats, stats_file, indent=2)
+    return stats
+
+
+def read_ccache_stats(out_path):
+    try:
+        with open(os.path.join(out_path, CCACHE_STATS), 'rt',
+                  encoding='utf-8') as stats_file:
+            return json.load(stats_file)
+    except (OSError, ValueError):
+        return None
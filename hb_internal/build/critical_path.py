@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import bisect
+import json
+import subprocess
+from collections import defaultdict
+
+from hb_internal.common.utils import hb_info
+from hb_internal.common.utils import hb_warning
+from hb_internal.common.utils import OHOSException
+from hb_internal.build.ninja_log import read_ninja_log
+
+# Lines of "ninja -t graph", file nodes, edge nodes of multi in/out
+# edges (shape=ellipse) and arrows between them.
+GRAPH_NODE_PATTERN = re.compile(
+    r'^"(0x[0-9a-f]+)" \[label="(.*)"(, shape=ellipse)?\]$')
+GRAPH_ARROW_PATTERN = re.compile(r'^"(0x[0-9a-f]+)" -> "(0x[0-9a-f]+)"')
+
+TIMELINE_BUCKETS = 50
+
+
+def read_ninja_graph(ninja_path, out_path, targets=None, env=None):
+    """Parse "ninja -t graph" output into (labels, preds).
+
+    labels maps node ids to file paths, edge nodes are left out. preds
+    maps every node id to the ids it directly depends on.
+    """
+    labels = {}
+    preds = defaultdict(list)
+    cmd = [ninja_path, '-C', out_path, '-t', 'graph'] + list(targets or [])
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL,
+                               universal_newlines=True, env=env)
+    for line in process.stdout:
+        match = GRAPH_ARROW_PATTERN.match(line)
+        if match is not None:
+            preds[match.group(2)].append(match.group(1))
+            continue
+        match = GRAPH_NODE_PATTERN.match(line)
+        if match is not None and match.group(3) is None:
+            labels[match.group(1)] = match.group(2)
+    process.wait()
+    if process.returncode != 0:
+        raise OHOSException(f'command: "{" ".join(cmd)}" failed')
+    return labels, preds
+
+
+def graph_critical_path(labels, preds, durations):
+    """Return the heaviest chain of outputs through the build graph.
+
+    A file node weighs the duration of the action which produced it in
+    the last build, up-to-date and phony nodes weigh nothing.
+    """
+    finish = {}
+    best_pred = {}
+    for root in list(preds.keys()) + list(labels.keys()):
+        if root in finish:
+            continue
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in finish:
+                stack.pop()
+                continue
+            pending = [pred for pred in preds.get(node, ())
+                       if pred not in finish]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            pred = max(preds.get(node, ()), key=finish.get, default=None)
+            finish[node] = durations.get(labels.get(node), 0) + \
+                (finish[pred] if pred is not None else 0)
+            best_pred[node] = pred
+
+    node = max(finish, key=finish.get, default=None)
+    path = []
+    while node is not None:
+        output = labels.get(node)
+        if output in durations:
+            path.append(output)
+        node = best_pred[node]
+    path.reverse()
+    return path
+
+
+def timing_critical_path(actions):
+    """Approximate the critical path from the ninja log alone.
+
+    Walking back from the last action, the predecessor of an action is
+    the one that finished last before it started.
+    """
+    by_end = sorted(actions, key=lambda action: action.end)
+    ends = [action.end for action in by_end]
+    path = []
+    index = len(by_end) - 1
+    while index >= 0:
+        action = by_end[index]
+        path.append(action.outputs[0])
+        index = bisect.bisect_right(ends, action.start, 0, index) - 1
+    path.reverse()
+    return path
+
+
+def get_parallelism(actions, buckets=TIMELINE_BUCKETS):
+    if not actions:
+        return {'average': 0, 'peak': 0, 'timeline': []}
+    begin = min(action.start for action in actions)
+    end = max(action.end for action in actions)
+    wall = max(end - begin, 1)
+
+    events = sorted([(action.start, 1) for action in actions] +
+                    [(action.end, -1) for action in actions])
+    running = 0
+    peak = 0
+    for _, delta in events:
+        running += delta
+        peak = max(peak, running)
+
+    bucket_size = max(wall / buckets, 1)
+    busy = [0] * buckets
+    for action in actions:
+        first = min(int((action.start - begin) / bucket_size), buckets - 1)
+        last = min(int((action.end - begin) / bucket_size), buckets - 1)
+        for bucket in range(first, last + 1):
+            bucket_begin = begin + bucket * bucket_size
+            overlap = min(action.end, bucket_begin + bucket_size) - \
+                max(action.start, bucket_begin)
+            busy[bucket] += max(overlap, 0)
+
+    total = sum(action.end - action.start for action in actions)
+    return {
+        'average': round(total / wall, 2),
+        'peak': peak,
+        'timeline': [{'start_ms': int(bucket * bucket_size),
+                      'parallelism': round(value / bucket_size, 2)}
+                     for bucket, value in enumerate(busy)],
+    }
+
+
+def get_concurrency(actions, action):
+    # Mean number of actions running alongside the given one.
+    duration = action.end - action.start
+    if duration <= 0:
+        return 0
+    overlap = sum(min(other.end, action.end) - max(other.start, action.start)
+                  for other in actions
+                  if other.start < action.end and other.end > action.start)
+    return round(overlap / duration, 2)
+
+
+def analyze_build(out_path, ninja_path='ninja', targets=None, top=20,
+                  use_graph=True, env=None):
+    ninja_log = os.path.join(out_path, '.ninja_log')
+    if not os.path.isfile(ninja_log):
+        raise OHOSException(f'{ninja_log} not found, please build first')
+    actions = read_ninja_log(ninja_log)
+    action_of_output = {}
+    for action in actions:
+        for output in action.outputs:
+            action_of_output[output] = action
+    durations = {output: action.end - action.start
+                 for output, action in action_of_output.items()}
+
+    path = None
+    method = 'graph'
+    if use_graph:
+        try:
+            labels, preds = read_ninja_graph(ninja_path, out_path, targets,
+                                             env=env)
+            path = graph_critical_path(labels, preds, durations)
+        except (OSError, OHOSException) as exception:
+            hb_warning(f'ninja graph unavailable: {exception}')
+    if path is None:
+        method = 'timing'
+        path = timing_critical_path(actions)
+
+    path_actions = []
+    for output in path:
+        action = action_of_output[output]
+        if not path_actions or path_actions[-1] is not action:
+            path_actions.append(action)
+    serial_actions = sorted(path_actions,
+                            key=lambda action: action.start - action.end)
+    report = {
+        'method': method,
+        'actions': len(actions),
+        'critical_path_ms': sum(action.end - action.start
+                                for action in path_actions),
+        'critical_path': [{'outputs': action.outputs,
+                           'duration_ms': action.end - action.start}
+                          for action in path_actions],
+        'parallelism': get_parallelism(actions),
+        'serializing_actions': [
+            {'outputs': action.outputs,
+             'duration_ms': action.end - action.start,
+             'concurrency': get_concurrency(actions, action)}
+            for action in serial_actions[:top]],
+    }
+
+    report_file = os.path.join(out_path, 'critical_path.json')
+    with open(report_file, 'wt', encoding='utf-8') as report_f:
+        json.dump(report, report_f, indent=2)
+
+    parallelism = report['parallelism']
+    hb_info(f'critical path: {report["critical_path_ms"] / 1000:.1f}s '
+            f'over {len(path_actions)} actions ({method})')
+    hb_info(f'parallelism: average {parallelism["average"]}, '
+            f'peak {parallelism["peak"]}')
+    hb_info(f'top {len(report["serializing_actions"])} serializing actions:')
+    for item in report['serializing_actions']:
+        hb_info(f'  {item["duration_ms"] / 1000:8.1f}s '
+                f'(x{item["concurrency"]}) {", ".join(item["outputs"])}')
+    hb_info(f'critical path report: {report_file}')
+    return report
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import json
+import time
+import hashlib
+
+from hb_internal.common.utils import write_file_if_changed
+
+GN_STAMP = '.hb_gn_stamp.json'
+# Read by the version_info action of BUILD.gn, ninja reruns it whenever
+# hb writes a new build time, with or without gn gen.
+BUILD_TIME_FILE = 'build_time'
+
+# name = value pairs of args.gn, values may be quoted strings with spaces.
+GN_ARG_PATTERN = re.compile(r'([A-Za-z_]\w*)\s*=\s*("(?:[^"\\]|\\.)*"|\S+)')
+
+# Args which change on every build, a difference in them alone does not
+# make gn gen run again. BUILD.gn takes the build time from
+# BUILD_TIME_FILE, not from these args.
+VOLATILE_GN_ARGS = ('ohos_build_time', 'ohos_build_datetime')
+
+
+def normalize_gn_args(text):
+    return {name: value for name, value in GN_ARG_PATTERN.findall(text)
+            if name not in VOLATILE_GN_ARGS}
+
+
+def format_gn_args(args_list):
+    """Return args.gn content for name=value entries of register_args.
+
+    Args are sorted and deduplicated, the last value of an arg wins.
+    """
+    args = {}
+    for arg in args_list:
+        name, _, value = arg.partition('=')
+        args[name.strip()] = value.strip()
+    return ''.join(f'{name} = {args[name]}\n' for name in sorted(args))
+
+
+def write_gn_args(out_path, content):
+    """Write args.gn, unless it already holds content.
+
+    Return whether the file was written, an untouched args.gn keeps
+    ninja from running gn again.
+    """
+    return write_file_if_changed(os.path.join(out_path, 'args.gn'), content)
+
+
+def write_build_time(out_path, build_time):
+    """Write the build time for the version_info action."""
+    os.makedirs(out_path, exist_ok=True)
+    with open(os.path.join(out_path, BUILD_TIME_FILE), 'wt',
+              encoding='utf-8') as time_file:
+        time_file.write(f'{build_time}\n')
+
+
+def read_ninja_deps(build_ninja_d):
+    """Return the absolute paths of the inputs listed in build.ninja.d."""
+    with open(build_ninja_d, 'rt', encoding='utf-8') as deps_file:
+        content = deps_file.read().replace('\\\n', ' ')
+    _, _, inputs = content.partition(': ')
+    out_path = os.path.dirname(os.path.abspath(build_ninja_d))
+    # Spaces in paths are escaped as '\ '.
+    return [os.path.normpath(os.path.join(out_path, path.replace('\0', ' ')))
+            for path in inputs.replace('\\ ', '\0').split()]
+
+
+def file_hash(path):
+    with open(path, 'rb') as input_file:
+        return hashlib.sha256(input_file.read()).hexdigest()
+
+
+class GnStamp():
+    """Decide whether the files generated by the last gn gen are fresh.
+
+    The stamp records the gn command line and the time gn gen started.
+    Inputs generated by hb itself under hashed_dir are also hashed, since
+    they may be rewritten with the same content before every build.
+    """
+    def __init__(self, out_path, hashed_dir=None):
+        self._out_path = out_path
+        self._stamp_file = os.path.join(out_path, GN_STAMP)
+        self._hashed_dir = hashed_dir and os.path.abspath(hashed_dir)
+        self._gen_start = None
+
+    def check(self, gn_cmd, gn_args):
+        """Return the reason gn gen has to run, None if it can be skipped."""
+        for name in ('build.ninja', 'build.ninja.d', 'args.gn'):
+            if not os.path.isfile(os.path.join(self._out_path, name)):
+                return f'{name} not found'
+        try:
+            with open(self._stamp_file, 'rt', encoding='utf-8') as stamp_file:
+                stamp = json.load(stamp_file)
+        except (OSError, ValueError):
+            return 'no record of the last gn gen'
+        if stamp.get('cmd') != gn_cmd:
+            return 'gn command line changed'
+
+        with open(os.path.join(self._out_path, 'args.gn'), 'rt',
+                  encoding='utf-8') as args_file:
+            last_args = normalize_gn_args(args_file.read())
+        args = normalize_gn_args(gn_args)
+        changed = sorted(name for name in set(args) | set(last_args)
+                         if args.get(name) != last_args.get(name))
+        if changed:
+            return f'gn args changed: {", ".join(changed)}'
+
+        hashes = stamp.get('hashes', {})
+        args_file = os.path.abspath(os.path.join(self._out_path, 'args.gn'))
+        for path in read_ninja_deps(
+                os.path.join(self._out_path, 'build.ninja.d')):
+            # args.gn was compared above, ignoring the volatile args.
+            if path == args_file:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return f'{path} removed'
+            if mtime <= stamp['gen_start']:
+                continue
+            if path not in hashes or file_hash(path) != hashes[path]:
+                return f'{path} changed'
+        return None
+
+    def invalidate(self):
+        self._gen_start = time.time_ns()
+        if os.path.exists(self._stamp_file):
+            os.remove(self._stamp_file)
+
+    def update(self, gn_cmd):
+        """Record a successful gn gen started at the last invalidate()."""
+        hashes = {}
+        if self._hashed_dir is not None:
+            prefix = os.path.join(self._hashed_dir, '')
+            for path in read_ninja_deps(
+                    os.path.join(self._out_path, 'build.ninja.d')):
+                if path.startswith(prefix) and os.path.isfile(path):
+                    hashes[path] = file_hash(path)
+        with open(self._stamp_file, 'wt', encoding='utf-8') as stamp_file:
+            json.dump({'cmd': gn_cmd,
+                       'gen_start': self._gen_start,
+                       'hashes': hashes}, stamp_file, indent=2)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import json
+import zlib
+import tarfile
+import importlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from hb_internal.common.utils import OHOSException
+
+COMPRESSORS = ('gzip', 'zstd')
+ARCHIVE_NAMES = {'gzip': 'images.tar.gz', 'zstd': 'images.tar.zst'}
+PACKAGE_STAMP = '.hb_images_package.json'
+# Size of the blocks compressed in parallel, one gzip member each.
+BLOCK_SIZE = 4 << 20
+GZIP_LEVEL = 6
+
+
+def _gzip_member(data):
+    # zlib releases the GIL while compressing, the blocks of a stream
+    # are compressed on all cores.
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter():
+    """Write-only file object compressing blocks in parallel.
+
+    Every block becomes a gzip member of its own. Concatenated members
+    are a valid gzip file, gunzip and tar -z read it like any other.
+    Blocks of zeros, eg: the holes of sparse images, are compressed once.
+    """
+    def __init__(self, out_file, workers=None):
+        self._out_file = out_file
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._zero_members = {}
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:BLOCK_SIZE]))
+            del self._buffer[:BLOCK_SIZE]
+        return len(data)
+
+    def _compress(self, block):
+        if block.count(0) == len(block):
+            member = self._zero_members.get(len(block))
+            if member is None:
+                member = self._zero_members[len(block)] = _gzip_member(block)
+            return member
+        return _gzip_member(block)
+
+    def _submit(self, block):
+        self._pending.append(self._executor.submit(self._compress, block))
+        # Bound the memory held by blocks waiting to be written.
+        while len(self._pending) > 2 * self._workers:
+            self._out_file.write(self._pending.popleft().result())
+
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._out_file.write(self._pending.popleft().result())
+        self._executor.shutdown()
+
+
+class SparseFile():
+    """Read-only file object skipping the disk reads of sparse file holes.
+
+    Holes are found with SEEK_DATA and SEEK_HOLE and read as zeros
+    without touching the disk. The zeros still go into the archive,
+    only the reads are saved.
+    """
+    def __init__(self, path):
+        self._fd = os.open(path, os.O_RDONLY)
+        self._size = os.fstat(self._fd).st_size
+        self._pos = 0
+        # The data range at or after pos, zeros up to its start.
+        self._range = (0, 0)
+
+    def read(self, size=-1):
+        if size < 0 or size > self._size - self._pos:
+            size = self._size - self._pos
+        chunks = []
+        while size > 0:
+            data_start, data_end = self._range
+            if self._pos >= data_end:
+                data_start, data_end = self._range = self._data_range()
+            if self._pos < data_start:
+                chunk = bytes(min(size, data_start - self._pos))
+            else:
+                chunk = os.pread(self._fd, min(size, data_end - self._pos),
+                                 self._pos)
+                if not chunk:
+                    break
+            chunks.append(chunk)
+            self._pos += len(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _data_range(self):
+        if not hasattr(os, 'SEEK_DATA'):
+            return self._pos, self._size
+        try:
+            data_start = os.lseek(self._fd, self._pos, os.SEEK_DATA)
+        except OSError:
+            # No data after pos, the rest of the file is a hole.
+            return self._size, self._size
+        return data_start, os.lseek(self._fd, data_start, os.SEEK_HOLE)
+
+    def close(self):
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _image_files(image_path):
+    """Yield image_path, the directories and the files under it, sorted."""
+    for root, dirs, files in os.walk(image_path):
+        dirs.sort()
+        yield root
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
+
+def _signature(image_path, compressor):
+    files = []
+    for path in _image_files(image_path):
+        stat = os.lstat(path)
+        files.append([os.path.relpath(path, image_path), stat.st_size,
+                      stat.st_mtime_ns])
+    return {'compressor': compressor, 'files': files}
+
+
+def _open_compressed(out_file, compressor):
+    if compressor == 'gzip':
+        return ParallelGzipWriter(out_file)
+    try:
+        zstandard = importlib.import_module('zstandard')
+    except ImportError:
+        raise OHOSException('the zstd image compressor needs the python '
+                            'zstandard package, run: pip3 install zstandard')
+    return zstandard.ZstdCompressor(threads=-1).stream_writer(
+        out_file, closefd=False)
+
+
+def package_images(image_path, out_path, compressor='gzip'):
+    """Pack image_path into an archive under out_path.
+
+    Return the archive, or None when it already holds the images: the
+    name, size and mtime of every image are kept next to the archive and
+    packing is skipped while none of them changed. Images are stored as
+    regular members, tarfile can not write GNU sparse members, so sparse
+    images unpack fully allocated.
+    """
+    if compressor not in COMPRESSORS:
+        raise OHOSException(f'unknown image compressor {compressor}')
+    archive = os.path.join(out_path, ARCHIVE_NAMES[compressor])
+    stamp_file = os.path.join(out_path, PACKAGE_STAMP)
+    signature = _signature(image_path, compressor)
+    if os.path.isfile(archive):
+        try:
+            with open(stamp_file, 'rt', encoding='utf-8') as stamp:
+                if json.load(stamp) == signature:
+                    return None
+        except (OSError, ValueError):
+            pass
+
+    tmp_archive = f'{archive}.tmp'
+    try:
+        with open(tmp_archive, 'wb') as out_file:
+            writer = _open_compressed(out_file, compressor)
+            # Members keep the path tar gave them: the image dir without
+            # the leading '/'.
+            with tarfile.open(fileobj=writer, mode='w|',
+                              format=tarfile.GNU_FORMAT) as tar:
+                for path in _image_files(image_path):
+                    tarinfo = tar.gettarinfo(path)
+                    if tarinfo.isreg():
+                        with SparseFile(path) as image:
+                            tar.addfile(tarinfo, image)
+                    else:
+                        tar.addfile(tarinfo)
+            writer.close()
+        os.replace(tmp_archive, archive)
+    finally:
+        if os.path.exists(tmp_archive):
+            os.remove(tmp_archive)
+    with open(stamp_file, 'wt', encoding='utf-8') as stamp:
+        json.dump(signature, stamp)
+    return archive
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hb_internal.common.config import Config
+from hb_internal.common.utils import hb_info
+from hb_internal.common.utils import hb_error
+from hb_internal.common.utils import hb_warning
+from hb_internal.common.utils import OHOSException
+from hb_internal.set.set import set_product
+
+
+def parse_products(products):
+    """Split 'a@vendor,b' into [('a', 'vendor'), ('b', None)]."""
+    product_list = []
+    for spec in products.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        product, _, company = spec.partition('@')
+        product_list.append((product, company or None))
+    if not product_list:
+        raise OHOSException(f'no product in --products "{products}"')
+    return product_list
+
+
+def default_job_budget():
+    # The same number of jobs ninja runs by default on this machine.
+    return (os.cpu_count() or 1) + 2
+
+
+def split_job_budget(budget, count):
+    """Give each of count concurrent ninja runs a share of budget jobs."""
+    return [budget // count + (1 if index < budget % count else 0) or 1
+            for index in range(count)]
+
+
+class MultiProductBuild():
+    """Build several products from one source tree at the same time.
+
+    Every product gets its own Config, isolated from ohos_config.json and
+    from the other products, and is built in its own thread: prepare,
+    preloader and gn gen of all products run concurrently. The ninja runs
+    share a job budget, each one gets a fixed part of it with -j, so the
+    machine is kept busy without running budget * products jobs.
+    Each Build runs its commands with an environment of its own and
+    writes a ccache log of its own, os.environ is not changed.
+    """
+    def __init__(self, products, prepare_build, jobs=None):
+        """prepare_build(config) returns (build, cmd_args, ninja)."""
+        self._products = parse_products(products)
+        self._prepare_build = prepare_build
+        self._jobs = jobs
+
+    def run(self, full_compile, patch=False):
+        builds = []
+        # Product lookup shares the product index, keep it in this thread.
+        for product, company in self._products:
+            config = Config.isolated()
+            set_product(product_name=product, company=company, config=config)
+            builds.append((product, self._prepare_build(config)))
+        self._check_out_paths(builds)
+        if any(cmd_args.get('profile') for _, (_, cmd_args, _) in builds):
+            # tracemalloc and the profiler hooks are process wide.
+            hb_warning('--profile is ignored when building several products')
+            for _, (_, cmd_args, _) in builds:
+                cmd_args['profile'] = False
+
+        # --jobs is the budget of all the products together.
+        budget = self._jobs or \
+            builds[0][1][1]['ninja'].get('jobs') or default_job_budget()
+        jobs = split_job_budget(budget, len(builds))
+        hb_info(f'building {len(builds)} products, '
+                f'{budget} jobs: {", ".join(map(str, jobs))}')
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=len(builds)) as executor:
+            futures = [
+                executor.submit(self._build, prepared, product_jobs,
+                                full_compile, patch)
+                for (_, prepared), product_jobs in zip(builds, jobs)]
+            results = [(product, future.exception())
+                       for (product, _), future in zip(builds, futures)]
+
+        failed = [product for product, exception in results if exception]
+        for product, exception in results:
+            if exception is None:
+                hb_info(f'{product}: build success')
+            else:
+                hb_error(f'{product}: build failed: {exception}')
+        hb_info(f'cost time: {time.time() - start_time:.1f}s')
+        if failed:
+            raise OHOSException(f'failed to build {", ".join(failed)}')
+        return 0
+
+    @staticmethod
+    def _check_out_paths(builds):
+        out_paths = {}
+        for product, (build, _, _) in builds:
+            out_path = os.path.abspath(build.config.out_path)
+            if out_path in out_paths:
+                raise OHOSException(
+                    f'{product} and {out_paths[out_path]} are both built '
+                    f'in {out_path}, they can not be built at the same time')
+            out_paths[out_path] = product
+
+    @staticmethod
+    def _build(prepared, jobs, full_compile, patch):
+        build, cmd_args, ninja = prepared
+        cmd_args['ninja']['jobs'] = jobs
+        # A ccache log of its own, so its stats only count its compiles
+        # and rotating it does not pull the log from under another build.
+        cmd_args['ccache_log_suffix'] = build.config.product
+        if cmd_args.get('events'):
+            events, ext = os.path.splitext(cmd_args['events'])
+            cmd_args['events'] = f'{events}_{build.config.product}{ext}'
+        return build.build(full_compile, patch=patch, ninja=ninja,
+                           cmd_args=cmd_args)
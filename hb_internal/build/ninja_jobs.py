@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from hb_internal.common.utils import dump_json_file
+
+GIB = 1 << 30
+# Memory a compile job is given when -j is derived from free memory.
+COMPILE_JOB_MEMORY = GIB
+# Memory a link job is given when sizing the link pool.
+LINK_JOB_MEMORY = 4 * GIB
+# Part of the total memory the link pool may take.
+LINK_MEMORY_RATIO = 0.75
+BUILD_RESOURCES = '.hb_build_resources.json'
+
+
+def read_meminfo(meminfo='/proc/meminfo'):
+    """Return the fields of /proc/meminfo in bytes, {} if unavailable."""
+    info = {}
+    try:
+        with open(meminfo, 'rt', encoding='utf-8') as meminfo_file:
+            for line in meminfo_file:
+                name, _, value = line.partition(':')
+                fields = value.split()
+                if fields and fields[0].isdigit():
+                    info[name] = int(fields[0]) * 1024
+    except OSError:
+        pass
+    return info
+
+
+def auto_ninja_jobs(meminfo=None):
+    """Return ninja -j and -l for this machine.
+
+    -j is the ninja default of cores + 2, lowered when the available
+    memory can not hold that many compile jobs, -l keeps ninja from
+    starting jobs while the load is above the core count.
+    """
+    cores = os.cpu_count() or 1
+    meminfo = read_meminfo() if meminfo is None else meminfo
+    jobs = cores + 2
+    if 'MemAvailable' in meminfo:
+        jobs = max(1, min(jobs, meminfo['MemAvailable'] // COMPILE_JOB_MEMORY))
+    return jobs, cores
+
+
+def link_pool_depth(meminfo=None):
+    """Return the depth of the gn link pool, None if memory is unknown.
+
+    Every link is given LINK_JOB_MEMORY. ninja does not report the memory
+    of an edge, and the peak child RSS is not specific to the links.
+    """
+    meminfo = read_meminfo() if meminfo is None else meminfo
+    if 'MemTotal' not in meminfo:
+        return None
+    depth = int(meminfo['MemTotal'] * LINK_MEMORY_RATIO) // LINK_JOB_MEMORY
+    return max(1, min(os.cpu_count() or 1, depth))
+
+
+def children_peak_rss():
+    """Return the largest RSS in bytes of a waited for subprocess.
+
+    This is the largest single child reaped over the whole hb process,
+    gn, compilers and scripts included, and it never goes down.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+
+
+def record_peak_child_rss(out_path, peak_before):
+    """Record the peak child RSS if it grew during the last ninja run.
+
+    It is the largest process of the build, whatever its rule, kept in
+    BUILD_RESOURCES for reference only. Otherwise the last record is
+    kept.
+    """
+    peak_after = children_peak_rss()
+    if peak_after is None or peak_before is None or \
+            peak_after <= peak_before:
+        return
+    dump_json_file(os.path.join(out_path, BUILD_RESOURCES),
+                   {'peak_child_rss': peak_after})
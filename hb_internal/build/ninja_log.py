@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import gc
+import heapq
+import json
+from collections import defaultdict
+from collections import namedtuple
+from json.encoder import encode_basestring_ascii
+
+from hb_internal.common.utils import OHOSException
+
+NINJA_LOG_HEADER = '# ninja log v'
+
+# Depth of the output directory used for the per-directory rollup,
+# eg: obj/foundation/arkui
+ROLLUP_DIR_DEPTH = 3
+
+# Tool guessed from the output extension, others use the extension.
+TOOL_OF_SUFFIX = {
+    '.o': 'compile',
+    '.obj': 'compile',
+    '.a': 'alink',
+    '.so': 'solink',
+    '.stamp': 'stamp',
+    '': 'link',
+}
+
+# start/end are milliseconds since ninja started, outputs is a list
+# since ninja logs one line per output of a multi-output edge.
+NinjaAction = namedtuple('NinjaAction',
+                         ['start', 'end', 'mtime', 'cmdhash', 'outputs'])
+
+
+def read_ninja_log(ninja_log):
+    """Stream a v5 .ninja_log and return the actions of the last build.
+
+    ninja's timestamps restart from zero for every invocation, so a
+    finish time going backwards means the entries of a newer build
+    follow and everything read so far is dropped.
+    """
+    actions = []
+    # Millions of small tuples would trigger many useless gc passes.
+    gc.disable()
+    try:
+        _read_actions(ninja_log, actions)
+    finally:
+        gc.enable()
+    return actions
+
+
+def _read_actions(ninja_log, actions):
+    last_end = 0
+    last_key = None
+    with open(ninja_log, 'rt', encoding='utf-8', errors='replace') as log:
+        header = log.readline()
+        if not header.startswith(NINJA_LOG_HEADER):
+            raise OHOSException(f'{ninja_log} is not a ninja log')
+        version = int(header[len(NINJA_LOG_HEADER):])
+        if version < 5:
+            raise OHOSException(f'unsupported ninja log version {version}')
+
+        for line in log:
+            fields = line.rstrip('\n').split('\t', 4)
+            if len(fields) != 5 or line.startswith('#'):
+                continue
+            start, end, mtime, output, cmdhash = fields
+            start = int(start)
+            end = int(end)
+            if end < last_end:
+                actions.clear()
+                last_key = None
+            last_end = end
+
+            key = (start, end, cmdhash)
+            if key == last_key:
+                actions[-1].outputs.append(output)
+                continue
+            last_key = key
+            actions.append(NinjaAction(start, end, int(mtime), cmdhash,
+                                       [output]))
+
+
+def get_tool(output):
+    dot = output.rfind('.')
+    suffix = output[dot:] if dot > output.rfind('/') else ''
+    return TOOL_OF_SUFFIX.get(suffix, suffix[1:])
+
+
+def get_rollup_dir(output):
+    parts = output.split('/', ROLLUP_DIR_DEPTH)
+    return '/'.join(parts[:-1]) or '.'
+
+
+class NinjaLogAnalyzer():
+    """Turn the last build of a .ninja_log into the post build reports.
+
+    One pass over the actions produces the chrome trace, the list of
+    actions sorted by duration and the per-directory/per-tool rollup.
+    """
+    def __init__(self, ninja_log, start_time=None):
+        self.actions = read_ninja_log(ninja_log)
+        # epoch seconds at which ninja started, used to place the trace.
+        self.start_time = start_time if start_time is not None else 0
+
+    def analyze(self, trace_file, duration_file, rollup_file):
+        gc.disable()
+        try:
+            return self._analyze(trace_file, duration_file, rollup_file)
+        finally:
+            gc.enable()
+
+    def _analyze(self, trace_file, duration_file, rollup_file):
+        lanes = []
+        free_lanes = []
+        trace_events = []
+        dir_cost = defaultdict(lambda: [0, 0])
+        tool_cost = defaultdict(lambda: [0, 0])
+        base_us = int(self.start_time * 10**6)
+
+        self.actions.sort(key=lambda action: (action.start, action.end))
+        for action in self.actions:
+            duration = action.end - action.start
+            # Reuse the lowest lane whose previous action has finished.
+            while lanes and lanes[0][0] <= action.start:
+                heapq.heappush(free_lanes, heapq.heappop(lanes)[1])
+            if free_lanes:
+                lane = heapq.heappop(free_lanes)
+            else:
+                lane = len(lanes) + len(free_lanes)
+            heapq.heappush(lanes, (action.end, lane))
+
+            output = action.outputs[0]
+            trace_events.append(
+                '{"name": %s, "cat": "targets", "ph": "X", "ts": %d, '
+                '"dur": %d, "pid": 0, "tid": %d, "args": {}}' % (
+                    encode_basestring_ascii(', '.join(action.outputs)),
+                    base_us + action.start * 1000, duration * 1000, lane))
+
+            cost = dir_cost[get_rollup_dir(output)]
+            cost[0] += 1
+            cost[1] += duration
+            cost = tool_cost[get_tool(output)]
+            cost[0] += 1
+            cost[1] += duration
+
+        with open(trace_file, 'wt', encoding='utf-8') as trace:
+            trace.write('[\n')
+            trace.write(',\n'.join(trace_events))
+            trace.write('\n]\n')
+
+        with open(duration_file, 'wt', encoding='utf-8') as durations:
+            for action in sorted(self.actions,
+                                 key=lambda action: action.start - action.end):
+                durations.write('{}: {}ms\n'.format(
+                    ', '.join(action.outputs), action.end - action.start))
+
+        rollup = {
+            'actions': len(self.actions),
+            'wall_time_ms': self.wall_time,
+            'directories': self._sort_cost(dir_cost),
+            'tools': self._sort_cost(tool_cost),
+        }
+        with open(rollup_file, 'wt', encoding='utf-8') as rollup_f:
+            json.dump(rollup, rollup_f, indent=2)
+        return rollup
+
+    @property
+    def wall_time(self):
+        if not self.actions:
+            return 0
+        return max(action.end for action in self.actions) - \
+            min(action.start for action in self.actions)
+
+    @staticmethod
+    def _sort_cost(cost_dict):
+        return [{'name': name, 'actions': count, 'duration_ms': duration}
+                for name, (count, duration) in sorted(
+                    cost_dict.items(), key=lambda item: -item[1][1])]
@@ -21,14 +21,11 @@ import re
 import json
 
 from hb_internal.common.utils import hb_info
-from hb_internal.common.config import Config
+from hb_internal.common.utils import read_json_file
 
-budle_json_files = []
-standard_part_roms = []
-part_info_list = []
 
-
-def part_size_compare(module_info_list, part_name, part_size):
+def part_size_compare(module_info_list, part_name, part_size,
+                      standard_part_roms, part_info_list):
     for standard_part in standard_part_roms:
         if standard_part['part_name'] == part_name and standard_part['part_size'] != 'None':
             sta_size = re.findall(r"\d+", standard_part['part_size'])
@@ -79,13 +76,12 @@ def collect_part_name(root_path):
     install_parts = []
     file_path = os.path.join(root_path, "packages/phone/system_install_parts.json")
     if os.path.isfile(file_path):
-        with open(file_path, 'rb') as file:
-            file_json = json.load(file)
-            for part_info in file_json:
-                part_info_dict = {}
-                part_info_dict["part_name"] = part_info["part_name"]
-                part_info_dict["part_info_file"] = part_info["part_info_file"]
-                install_parts.append(part_info_dict)
+        file_json = read_json_file(file_path, cache=False)
+        for part_info in file_json:
+            part_info_dict = {}
+            part_info_dict["part_name"] = part_info["part_name"]
+            part_info_dict["part_info_file"] = part_info["part_info_file"]
+            install_parts.append(part_info_dict)
     return install_parts
 
 
@@ -94,14 +90,13 @@ def colletct_modules_json_path(out_path, install_parts):
     for part_info_dict in install_parts:
         part_info_path = os.path.join(out_path, part_info_dict["part_info_file"])
         if os.path.isfile(part_info_path):
-            with open(part_info_path, 'rb') as file:
-                file_json = json.load(file)
-                for module_info in file_json:
-                    if module_info["part_name"] == part_info_dict["part_name"]:
-                        module_json_path = {}
-                        module_json_path["module_info_path"] = module_info["module_info_file"]
-                        module_json_path["part_name"] = module_info["part_name"]
-                        module_info_list.append(module_json_path)
+            file_json = read_json_file(part_info_path, cache=False)
+            for module_info in file_json:
+                if module_info["part_name"] == part_info_dict["part_name"]:
+                    module_json_path = {}
+                    module_json_path["module_info_path"] = module_info["module_info_file"]
+                    module_json_path["part_name"] = module_info["part_name"]
+                    module_info_list.append(module_json_path)
     return module_info_list
 
 
@@ -112,19 +107,18 @@ def sum_of_statistics(out_path, part_name, module_info_list):
         if part_name == module_info['part_name']:
             module_info_path = os.path.join(out_path, module_info['module_info_path'])
             if os.path.isfile(module_info_path):
-                with open(module_info_path, 'rb') as file:
-                    file_json = json.load(file)
-                    so_file_dir = os.path.join(out_path, file_json["source"])
-                    if so_file_dir.endswith(".so") and os.path.isfile(so_file_dir):
-                        module_info_dict = {}
-                        module_info_dict["module_name"] = file_json["label_name"]
-                        module_info_dict["source"] = file_json["source"]
-                        module_info_dict["dest"] = file_json["dest"]
-                        dest_num = len(file_json["dest"])
-                        so_file_size = os.path.getsize(so_file_dir) * dest_num
-                        part_so_size += so_file_size
-                        module_info_dict["module_size"] = f'{round(so_file_size / 1024, 2)}KB'
-                        module_list.append(module_info_dict)
+                file_json = read_json_file(module_info_path, cache=False)
+                so_file_dir = os.path.join(out_path, file_json["source"])
+                if so_file_dir.endswith(".so") and os.path.isfile(so_file_dir):
+                    module_info_dict = {}
+                    module_info_dict["module_name"] = file_json["label_name"]
+                    module_info_dict["source"] = file_json["source"]
+                    module_info_dict["dest"] = file_json["dest"]
+                    dest_num = len(file_json["dest"])
+                    so_file_size = os.path.getsize(so_file_dir) * dest_num
+                    part_so_size += so_file_size
+                    module_info_dict["module_size"] = f'{round(so_file_size / 1024, 2)}KB'
+                    module_list.append(module_info_dict)
     return module_list, part_so_size
 
 
@@ -142,8 +136,9 @@ def check_image_size(out_path):
     return image_list
 
 
-def actual_rom_statistics(out_path):
+def actual_rom_statistics(out_path, standard_part_roms):
     rom_statistics = {}
+    part_info_list = []
     install_parts = collect_part_name(out_path)
     module_info_list = colletct_modules_json_path(out_path, install_parts)
     image_list = check_image_size(out_path)
@@ -154,7 +149,9 @@ def actual_rom_statistics(out_path):
         part_so_size = f'{round(statistics_result[1] / 1024, 2)}KB'
         part_size_compare(statistics_result[0],
                             part_info_dict["part_name"],
-                            part_so_size)
+                            part_so_size,
+                            standard_part_roms,
+                            part_info_list)
     rom_statistics["parts_info"] = part_info_list
     json_path = os.path.join(out_path, 'rom_statistics_table.json')
     json_str = json.dumps(rom_statistics, indent=4)
@@ -162,20 +159,19 @@ def actual_rom_statistics(out_path):
         json_file.write(json_str)
     
 
-def read_bundle_json_file(file_path):
-    with open(file_path, 'rb') as file:
-        file_json = json.load(file)
-        standard_part_rom = {}
-        standard_part_rom["part_name"] = file_json["component"]["name"]
-        if 'rom' not in file_json["component"].keys() or file_json["component"]["rom"] == '':
-            standard_part_rom["part_size"] = 'None'
-        else:
-            standard_part_rom["part_size"] = file_json["component"]["rom"]
-        if standard_part_roms.count(standard_part_rom) == 0:
-            standard_part_roms.append(standard_part_rom)
+def read_bundle_json_file(file_path, standard_part_roms):
+    file_json = read_json_file(file_path, cache=False)
+    standard_part_rom = {}
+    standard_part_rom["part_name"] = file_json["component"]["name"]
+    if 'rom' not in file_json["component"].keys() or file_json["component"]["rom"] == '':
+        standard_part_rom["part_size"] = 'None'
+    else:
+        standard_part_rom["part_size"] = file_json["component"]["rom"]
+    if standard_part_roms.count(standard_part_rom) == 0:
+        standard_part_roms.append(standard_part_rom)
 
 
-def collect_bundle_json_path(part_root_path):
+def collect_bundle_json_path(part_root_path, budle_json_files):
     for root, dirs, files in os.walk(part_root_path):
         abs_path = os.path.abspath(root)
         for file_name in files:
@@ -183,54 +179,43 @@ def collect_bundle_json_path(part_root_path):
                 budle_json_files.append(os.path.join(abs_path, file_name))
 
 
-def read_subsystem_config(root_path):
+def read_subsystem_config(root_path, product_path):
     part_json_paths = []
     part_json_path = os.path.join(root_path, 'build/subsystem_config.json')
     if os.path.isfile(part_json_path):
-        with open(part_json_path, 'r') as file:
-            file_json = json.load(file)
-            for part_info_valule in file_json.values():
-                for path_k, path_v in part_info_valule.items():
-                    if path_k == "path":
-                        part_json_paths.append(path_v)
-    conf = Config()
-    part_json_overlay_path = conf.product_path
+        file_json = read_json_file(part_json_path)
+        for part_info_valule in file_json.values():
+            for path_k, path_v in part_info_valule.items():
+                if path_k == "path":
+                    part_json_paths.append(path_v)
+    part_json_overlay_path = product_path
     if os.path.isfile(part_json_overlay_path):
-        with open(part_json_overlay_path, 'r') as file:
-            file_json = json.load(file)
-            for part_info_valule in file_json.values():
-                for path_k, path_v in part_info_valule.items():
-                    if path_k == "path":
-                        part_json_paths.append(path_v)
+        file_json = read_json_file(part_json_overlay_path)
+        for part_info_valule in file_json.values():
+            for path_k, path_v in part_info_valule.items():
+                if path_k == "path":
+                    part_json_paths.append(path_v)
 
     return part_json_paths
 
 
-def read_ohos_config(root_path):
-    file_path = os.path.join(root_path, "ohos_config.json")
-    with open(file_path, 'r') as file:
-        file_json = json.load(file)
-        os_level = file_json["os_level"]
-        out_path = file_json["out_path"]
-        board = file_json["board"]
-        product = file_json["product"]
-    return (out_path, board, product, os_level)
-
-
-def output_part_rom_status(root_path):
-    ohos_config = read_ohos_config(root_path)
-    if ohos_config[3] == "mini":
+def output_part_rom_status(root_path, config):
+    # The config of the build, not ohos_config.json: products built at
+    # the same time each have their own.
+    if config.os_level == "mini":
         return -1
-    elif ohos_config[3] == "small":
+    elif config.os_level == "small":
         return -1
     else:
-        part_paths = read_subsystem_config(root_path)
+        budle_json_files = []
+        standard_part_roms = []
+        part_paths = read_subsystem_config(root_path, config.product_path)
         for part_path in part_paths:
             part_root_path = os.path.join(root_path, part_path)
             if os.path.isdir(part_root_path):
-                collect_bundle_json_path(part_root_path)
+                collect_bundle_json_path(part_root_path, budle_json_files)
         for json_file in budle_json_files:
             if os.path.exists(json_file):
-                read_bundle_json_file(json_file)
-        actual_rom_statistics(ohos_config[0])
+                read_bundle_json_file(json_file, standard_part_roms)
+        actual_rom_statistics(config.out_path, standard_part_roms)
     return 0
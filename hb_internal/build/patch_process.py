@@ -28,8 +28,8 @@ class Patch():
     """Patch class for hb_internal.build --patch parameter
     Install the patch based on the configuration file.
     """
-    def __init__(self):
-        self.config = Config()
+    def __init__(self, config=None):
+        self.config = config if config is not None else Config()
         # Patch configuration file path
         self.patch_cfg = os.path.join(self.config.product_path, 'patch.yml')
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+from json.encoder import encode_basestring_ascii
+from contextlib import contextmanager
+
+PROGRESS_COUNT_PATTERN = re.compile(rb'\[(\d+)/(\d+)\] ?([^\r\n]*)')
+
+# Window in seconds used to compute the instantaneous action rate.
+RATE_WINDOW = 5.0
+
+
+class EventSink():
+    """Write build events as JSON lines.
+
+    Every record carries 'ts', seconds on the performance counter since
+    the sink was opened. A sink without path writes nothing so callers need
+    not check whether events were requested, phase durations are kept
+    in phase_times either way.
+    """
+    def __init__(self, path=None):
+        self._file = None
+        self._start = time.perf_counter()
+        # Post build steps run phases from several threads.
+        self._lock = threading.Lock()
+        self.phase_times = []
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+            self._file = open(path, 'wt', encoding='utf-8')
+            self.emit('build_start', time=time.time())
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def now(self):
+        return time.perf_counter() - self._start
+
+    def emit(self, event, ts=None, **fields):
+        if self._file is None:
+            return
+        record = {'event': event,
+                  'ts': round(self.now() if ts is None else ts, 6)}
+        record.update(fields)
+        self.write(json.dumps(record) + '\n')
+
+    def write(self, data):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(data)
+
+    @contextmanager
+    def phase(self, name):
+        start = self.now()
+        self.emit('phase_start', ts=start, phase=name)
+        status = 'failed'
+        try:
+            yield
+            status = 'success'
+        finally:
+            end = self.now()
+            self.phase_times.append({'phase': name,
+                                     'start': start,
+                                     'duration': end - start,
+                                     'status': status})
+            self.emit('phase_end', ts=end, phase=name,
+                      duration=round(end - start, 6), status=status)
+            with self._lock:
+                if self._file is not None:
+                    self._file.flush()
+
+    def progress_listener(self):
+        if self._file is None:
+            return None
+        return ProgressListener(self)
+
+    def close(self):
+        if self._file is None:
+            return
+        self.emit('build_end')
+        self._file.close()
+        self._file = None
+
+
+class ProgressListener():
+    """Log pump listener emitting one event per ninja progress line."""
+    def __init__(self, sink):
+        self._sink = sink
+        self._samples = deque()
+
+    def feed(self, block, offset):
+        matches = PROGRESS_COUNT_PATTERN.findall(block)
+        if not matches:
+            return
+        ts = self._sink.now()
+        rate = self._rate(ts, int(matches[-1][0]))
+        # Records are formatted by hand, json.dumps per line would cost
+        # more than everything else the log pump does.
+        prefix = '{"event": "progress", "ts": %.6f, ' % ts
+        rate_text = 'null' if rate is None else repr(rate)
+        records = []
+        for done, total, action in matches:
+            done = int(done)
+            total = int(total)
+            eta = 'null' if not rate else '%.3f' % ((total - done) / rate)
+            action = encode_basestring_ascii(
+                action.decode('utf-8', errors='replace'))
+            records.append(f'{prefix}"completed": {done}, "total": {total}, '
+                           f'"rate": {rate_text}, "eta": {eta}, '
+                           f'"action": {action}}}\n')
+        self._sink.write(''.join(records))
+
+    def _rate(self, ts, completed):
+        samples = self._samples
+        samples.append((ts, completed))
+        while len(samples) > 2 and ts - samples[1][0] >= RATE_WINDOW:
+            samples.popleft()
+        first_ts, first_completed = samples[0]
+        if ts <= first_ts:
+            return None
+        return round((completed - first_completed) / (ts - first_ts), 3)
+
+    def close(self):
+        pass
@@ -17,8 +17,16 @@
 
 import os
 import sys
+import json
 import platform
+from contextlib import contextmanager
 from distutils.spawn import find_executable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from hb_internal import CONFIG_JSON
 from hb_internal import CONFIG_STRUCT
@@ -29,13 +37,19 @@ from hb_internal.common.utils import Singleton
 from hb_internal.common.utils import OHOSException
 from hb_internal.common.utils import download_tool
 from hb_internal.common.utils import makedirs
+from hb_internal.common.utils import parsed_file_cache
 
 
 class Config(metaclass=Singleton):
     def __init__(self):
         self.config_json = CONFIG_JSON
 
-        config_content = read_json_file(self.config_json)
+        config_content = dict(read_json_file(self.config_json))
+        # The content of ohos_config.json, updated in place by the setters.
+        # Only the keys set by this process are written back.
+        self._config_content = config_content
+        self._transaction_depth = 0
+        self._dirty = set()
         self._root_path = config_content.get('root_path', None)
         self._board = config_content.get('board', None)
         self._kernel = config_content.get('kernel', None)
@@ -381,11 +395,100 @@ class Config(metaclass=Singleton):
         self._patch_cache = value
         self.config_update('patch_cache', self._patch_cache)
 
+    @classmethod
+    def isolated(cls):
+        """Return a copy of the Config, not backed by ohos_config.json.
+
+        Properties set on the copy stay in memory, so several products
+        can be set up and built in one process.
+        """
+        config = cls.__new__(cls)
+        config.__dict__.update(Config().__dict__)
+        config.config_json = None
+        config._config_content = dict(config._config_content)
+        config._transaction_depth = 0
+        config._dirty = set()
+        config.fs_attr = set(config.fs_attr)
+        return config
+
     def config_create(self, config_path):
         dump_json_file(config_path, CONFIG_STRUCT)
         self.config_json = config_path
+        self._config_content = dict(CONFIG_STRUCT)
 
     def config_update(self, key, value):
-        config_content = read_json_file(self.config_json)
-        config_content[key] = value
-        dump_json_file(self.config_json, config_content)
+        self._config_content[key] = value
+        self._dirty.add(key)
+        if not self._transaction_depth:
+            self._config_write()
+
+    @contextmanager
+    def transaction(self):
+        """Write all the properties set in the block at once.
+
+        eg:
+            with config.transaction():
+                config.product = 'ipcamera'
+                config.board = 'hispark_taurus'
+
+        ohos_config.json is written once when the outermost block exits.
+        If the block raises, the properties set in it are restored and
+        nothing is written.
+        """
+        saved = dict(self.__dict__)
+        saved['_config_content'] = dict(self._config_content)
+        saved['_dirty'] = set(self._dirty)
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            depth = self._transaction_depth
+            self.__dict__.clear()
+            self.__dict__.update(saved)
+            self._transaction_depth = depth
+            raise
+        finally:
+            self._transaction_depth -= 1
+        if not self._transaction_depth and self._dirty:
+            self._config_write()
+
+    def _config_write(self):
+        if self.config_json is None:
+            self._dirty.clear()
+            return
+        # An hb set from another shell may have changed ohos_config.json
+        # since it was read: under a lock, read it again and write only
+        # the keys set here. The temp file and rename keep an hb running
+        # at the same time from reading a partially written file. The
+        # lock is taken on the directory, no lock file is left behind in
+        # the source tree.
+        lock_fd = None
+        if fcntl is not None:
+            lock_fd = os.open(
+                os.path.dirname(os.path.abspath(self.config_json)),
+                os.O_RDONLY)
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(self.config_json, 'rt',
+                          encoding='utf-8') as json_file:
+                    content = json.load(json_file)
+            except (OSError, ValueError):
+                content = {}
+            for key in self._dirty:
+                content[key] = self._config_content[key]
+            tmp_file = f'{self.config_json}.{os.getpid()}.tmp'
+            try:
+                with open(tmp_file, 'wt', encoding='utf-8') as json_file:
+                    json.dump(content, json_file, ensure_ascii=False,
+                              indent=2)
+                os.replace(tmp_file, self.config_json)
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+        finally:
+            if lock_fd is not None:
+                os.close(lock_fd)
+        parsed_file_cache.invalidate(self.config_json)
+        self._dirty.clear()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import sys
+import threading
+
+# ninja progress line, eg: [12/3456] CXX obj/foo/bar.o
+PROGRESS_PATTERN = re.compile(rb'\[\d+/\d+\][^\r\n]+')
+
+CHUNK_SIZE = 1 << 20
+REFRESH_INTERVAL = 0.1
+
+
+def last_progress(block):
+    """Return the match of the last ninja progress line in block."""
+    # Scan backwards line by line, the last line is usually a match.
+    end = len(block)
+    while end > 0:
+        start = block.rfind(b'\n', 0, end - 1) + 1
+        match = PROGRESS_PATTERN.search(block, start, end)
+        if match is not None:
+            return match
+        end = start
+    return None
+
+
+class ConsoleRenderer(threading.Thread):
+    """Render pumped output to the console from a separate thread.
+
+    Output is coalesced and flushed at most once per interval. In
+    log_filter mode only the latest ninja progress line is kept, since
+    intermediate ones would be overwritten by the next refresh anyway.
+    """
+    def __init__(self, console, render, log_filter=False,
+                 interval=REFRESH_INTERVAL):
+        super(ConsoleRenderer, self).__init__(daemon=True)
+        # Output captured per thread goes where the pumping thread's does.
+        self.parent_thread = threading.current_thread()
+        self._console = console
+        self._render = render
+        self._log_filter = log_filter
+        self._interval = interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def feed(self, block, offset):
+        if self._log_filter:
+            progress = last_progress(block)
+            if progress is None:
+                return
+            with self._lock:
+                self._pending = [progress.group()]
+        else:
+            with self._lock:
+                self._pending.append(block)
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            self._flush()
+        self._flush()
+
+    def close(self):
+        self._stopped.set()
+        self.join()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        data = b''.join(pending).decode('utf-8', errors='replace')
+        self._console.write(''.join(
+            self._render(line) for line in data.splitlines()))
+        self._console.flush()
+
+
+class FailureIndexer():
+    """Record where ninja failures are in the build log while it streams.
+
+    A failed block starts at the progress line of the failed edge and
+    ends before the next progress line or 'ninja: build stopped'. Only
+    byte ranges are kept, so reporting costs O(failures) reads instead
+    of scanning the whole log afterwards.
+    """
+    def __init__(self):
+        self.failed_blocks = []
+        self.errors = []
+        self._block_start = None
+        self._block_failed = False
+        self._end = 0
+
+    def feed(self, block, offset):
+        self._end = offset + len(block)
+        if not self._block_failed and b'FAILED:' not in block and \
+                b'ninja: ' not in block:
+            # Fast path, only remember where the last edge started.
+            progress = last_progress(block)
+            if progress is not None:
+                line_start = block.rfind(b'\n', 0, progress.start()) + 1
+                self._block_start = offset + line_start
+            return
+
+        for line in block.splitlines(keepends=True):
+            is_progress = PROGRESS_PATTERN.search(line) is not None
+            if is_progress or b'ninja: build stopped' in line:
+                self._close_block(offset)
+                self._block_start = offset if is_progress else None
+            if b'FAILED:' in line and self._block_start is not None:
+                self._block_failed = True
+            error_start = line.find(b'ninja: error:')
+            if error_start >= 0:
+                self.errors.append((offset + error_start,
+                                    offset + len(line.rstrip())))
+            offset += len(line)
+
+    def close(self):
+        self._close_block(self._end)
+
+    def _close_block(self, end):
+        if self._block_failed:
+            self.failed_blocks.append((self._block_start, end))
+        self._block_failed = False
+
+    def read(self, log_file):
+        """Yield the recorded failed blocks and error lines as text."""
+        for start, end in self.failed_blocks + self.errors:
+            log_file.seek(start)
+            yield log_file.read(end - start).decode('utf-8',
+                                                    errors='replace')
+
+
+class LogPump():
+    """Copy a subprocess output stream to the build log.
+
+    The stream is read in large binary chunks which go to the log file
+    untouched. Complete lines are then handed to the listeners together
+    with their byte offset in the log file, the console renderer being
+    the first of them.
+    """
+    def __init__(self, stream, log_file, log_filter=False, render=None,
+                 console=None, interval=REFRESH_INTERVAL,
+                 chunk_size=CHUNK_SIZE):
+        self._stream = stream
+        self._log_file = log_file
+        self._chunk_size = chunk_size
+        self._renderer = ConsoleRenderer(
+            console if console is not None else sys.stdout,
+            render if render is not None else (lambda line: f'{line}\n'),
+            log_filter=log_filter,
+            interval=interval)
+        self._listeners = [self._renderer]
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def run(self):
+        fd = self._stream.fileno()
+        offset = self._log_file.tell()
+        tail = b''
+        self._renderer.start()
+        try:
+            while True:
+                chunk = os.read(fd, self._chunk_size)
+                if not chunk:
+                    break
+                self._log_file.write(chunk)
+                offset += len(chunk)
+
+                end = chunk.rfind(b'\n')
+                if end < 0:
+                    tail += chunk
+                    continue
+                block = tail + chunk[:end + 1]
+                tail = chunk[end + 1:]
+                self._dispatch(block, offset - len(tail) - len(block))
+            if tail:
+                self._dispatch(tail, offset - len(tail))
+        finally:
+            self._log_file.flush()
+            for listener in self._listeners:
+                listener.close()
+
+    def _dispatch(self, block, offset):
+        for listener in self._listeners:
+            listener.feed(block, offset)
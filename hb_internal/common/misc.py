@@ -17,39 +17,66 @@
 #
 
 import os
+import threading
 import subprocess
-from datetime import datetime
 from distutils.spawn import find_executable
 from hb_internal.common.utils import exec_command
+from hb_internal.common.utils import makedirs
+from hb_internal.common.utils import hb_info
 from hb_internal.common.utils import hb_warning
-from hb_internal.common.config import Config
+from hb_internal.common.build_events import EventSink
+from hb_internal.common.step_graph import StepGraph
+from hb_internal.build.ninja_log import NinjaLogAnalyzer
+from hb_internal.build.image_packager import package_images
+from hb_internal.build.ccache_log import CCACHE_LOG_ROTATE_SIZE
+from hb_internal.build.ccache_log import CCACHE_STATS
+from hb_internal.build.ccache_log import collect_ccache_stats
+from hb_internal.build.ccache_log import configured_max_size
+from hb_internal.build.ccache_log import mark_ccache_log
+from hb_internal.build.ccache_log import size_bytes
+
+# Directory under out_path with the logs of the post build steps.
+POST_BUILD_LOG_DIR = 'post_build'
 
 
 class PreBuild:
-    def __init__(self, config):
+    def __init__(self, config, env=None, ccache_log_suffix=None):
+        """env is the environment of the build commands, set_ccache adds
+        the ccache variables to it. Builds running at the same time give
+        a ccache_log_suffix each to keep their ccache logs apart.
+        """
         self._root_path = config.root_path
         self._out_path = config.out_path
         self._log_path = config.log_path
+        self._env = env if env is not None else os.environ
+        self._ccache_log_suffix = ccache_log_suffix
 
     def set_ccache(self):
-        ccache_local_dir = os.environ.get('CCACHE_LOCAL_DIR')
-        ccache_log_suffix = os.environ.get('CCACHE_LOG_SUFFIX')
+        env = self._env
+        ccache_local_dir = env.get('CCACHE_LOCAL_DIR')
+        ccache_log_suffix = env.get('CCACHE_LOG_SUFFIX')
+        if self._ccache_log_suffix:
+            ccache_log_suffix = '.'.join(
+                suffix for suffix in (ccache_log_suffix,
+                                      self._ccache_log_suffix) if suffix)
         if not ccache_local_dir:
             ccache_local_dir = '.ccache'
-        ccache_base = os.environ.get('CCACHE_BASE')
+        ccache_base = env.get('CCACHE_BASE')
 
         # The default value is HOME for local users
         if not ccache_base:
-            ccache_base = os.environ.get('HOME')
+            ccache_base = env.get('HOME')
         ccache_base = os.path.join(ccache_base, ccache_local_dir)
-        if not os.path.exists(ccache_base):
-            os.makedirs(ccache_base)
+        os.makedirs(ccache_base, exist_ok=True)
         ccache_log_file_name = "ccache.log"
         if ccache_log_suffix:
             ccache_log_file_name = "ccache." + ccache_log_suffix + ".log"
 
         logfile = os.path.join(ccache_base, ccache_log_file_name)
-        if os.path.exists(logfile):
+        # The log is parsed from where this build starts, it is only
+        # rotated when it grew too large.
+        if os.path.exists(logfile) and \
+                os.path.getsize(logfile) > CCACHE_LOG_ROTATE_SIZE:
             oldfile_name = ccache_log_file_name + ".old"
             oldfile = os.path.join(ccache_base, oldfile_name)
             if os.path.exists(oldfile):
@@ -60,18 +87,26 @@ class PreBuild:
         if ccache_path is None:
             hb_warning('Failed to find ccache, ccache disabled.')
             return
-        os.environ['CCACHE_EXEC'] = ccache_path
-        os.environ['CCACHE_LOGFILE'] = logfile
-        os.environ['USE_CCACHE'] = '1'
-        os.environ['CCACHE_DIR'] = ccache_base
-        os.environ['CCACHE_UMASK'] = '002'
-        os.environ['CCACHE_BASEDIR'] = self._root_path
-        ccache_max_size = os.environ.get('CCACHE_MAXSIZE')
+        env['CCACHE_EXEC'] = ccache_path
+        env['CCACHE_LOGFILE'] = logfile
+        env['USE_CCACHE'] = '1'
+        env['CCACHE_DIR'] = ccache_base
+        env['CCACHE_UMASK'] = '002'
+        env['CCACHE_BASEDIR'] = self._root_path
+        ccache_max_size = env.get('CCACHE_MAXSIZE')
         if not ccache_max_size:
             ccache_max_size = '100G'
+        makedirs(self._out_path, exist_ok=True)
+        mark_ccache_log(logfile, self._out_path)
 
+        # ccache -M only writes max_size to ccache.conf, skip it when the
+        # size is there already.
+        configured_size = configured_max_size(ccache_base)
+        if configured_size is not None and \
+                size_bytes(configured_size) == size_bytes(ccache_max_size):
+            return
         cmd = ['ccache', '-M', ccache_max_size]
-        exec_command(cmd, log_path=self._log_path)
+        exec_command(cmd, log_path=self._log_path, env=env)
 
     def set_pycache(self):
         pycache_dir = os.environ.get('CCACHE_BASE')
@@ -104,28 +139,57 @@ class PreBuild:
 
 
 class PostBuild:
-    def __init__(self, config):
+    def __init__(self, config, event_sink=None):
+        self._config = config
         self._root_path = config.root_path
         self._out_path = config.out_path
-        self._log_path = config.log_path
+        self._build_log_path = config.log_path
+        self._event_sink = event_sink if event_sink is not None \
+            else EventSink()
+        self._local = threading.local()
+
+    @property
+    def _log_path(self):
+        # Steps run by step() log to a file of their own.
+        return getattr(self._local, 'log_path', self._build_log_path)
+
+    def step(self, name, func, *args):
+        """Return a callable running func(*args) logging to name.log."""
+        def run_step():
+            log_dir = os.path.join(self._out_path, POST_BUILD_LOG_DIR)
+            os.makedirs(log_dir, exist_ok=True)
+            self._local.log_path = os.path.join(log_dir, f'{name}.log')
+            try:
+                func(*args)
+            finally:
+                del self._local.log_path
+        return run_step
+
+    def add_clean_steps(self, graph, start_time, disable_post_build_args):
+        steps = {
+            'stat_ccache': (self.stat_ccache, ),
+            'generate_ninja_trace': (self.generate_ninja_trace, start_time),
+            'compute_overlap_rate': (self.compute_overlap_rate, ),
+        }
+        for name, (func, *args) in steps.items():
+            if name not in disable_post_build_args:
+                graph.add(f'PostBuild.{name}', self.step(name, func, *args))
 
     def clean(self, start_time, disable_post_build_args):
-        if not disable_post_build_args or 'stat_ccache' not in disable_post_build_args:
-                self.stat_ccache()
-        if not disable_post_build_args or 'generate_ninja_trace' not in disable_post_build_args:
-                self.generate_ninja_trace(start_time)
-        if not disable_post_build_args or 'get_warning_list' not in disable_post_build_args:
-                self.get_warning_list()
-        if not disable_post_build_args or 'compute_overlap_rate' not in disable_post_build_args:
-                self.compute_overlap_rate()
-            
-    def package_image(self):
+        """Run the post build steps, return the names of failed ones."""
+        graph = StepGraph(self._event_sink)
+        self.add_clean_steps(graph, start_time, disable_post_build_args)
+        return graph.run()
+
+    def package_image(self, compressor='gzip'):
         image_path = os.path.join(self._out_path, 'packages/phone/images/')
         if os.path.exists(image_path):
-            packaged_file_path = os.path.join(self._out_path, 'images.tar.gz')
-            cmd = ['tar', '-zcvf', packaged_file_path, image_path]
-            exec_command(cmd, log_path=self._log_path)
-            
+            archive = package_images(image_path, self._out_path, compressor)
+            if archive is None:
+                hb_info('images unchanged, skip packaging')
+            else:
+                hb_info(f'images packaged to {archive}')
+
     def stat_pycache(self):
         cmd = [
             'python3', '{}/build/scripts/util/pyd.py'.format(self._root_path),
@@ -148,62 +212,31 @@ class PostBuild:
         exec_command(cmd, log_path=self._log_path)
 
     def stat_ccache(self):
-        ccache_path = find_executable('ccache')
-        if ccache_path is None:
+        stats = collect_ccache_stats(self._root_path, self._out_path)
+        if stats is None or not stats['total']:
             return
-
-        ccache_log_file_name = "ccache.log"
-        ccache_log_suffix = os.environ.get('CCACHE_LOG_SUFFIX')
-        if ccache_log_suffix:
-            ccache_log_file_name = "ccache." + ccache_log_suffix + ".log"
-        ccache_local_dir = os.environ.get('CCACHE_LOCAL_DIR')
-        if not ccache_local_dir:
-            ccache_local_dir = '.ccache'
-        ccache_base = os.environ.get('CCACHE_BASE')
-
-        # The default value is HOME for local users
-        if not ccache_base:
-            ccache_base = os.environ.get('HOME')
-        ccache_base = os.path.join(ccache_base, ccache_local_dir)
-        cmd = [
-            'python3', '{}/build/scripts/summary_ccache_hitrate.py'.format(
-                self._root_path), '{}/{}'.format(ccache_base, ccache_log_file_name)
-        ]
-        exec_command(cmd, log_path=self._log_path)
-
-    def get_warning_list(self):
-        cmd = [
-            'python3',
-            '{}/build/scripts/get_warnings.py'.format(self._root_path),
-            '--build-log-file',
-            '{}/build.log'.format(self._out_path),
-            '--warning-out-file',
-            '{}/packages/WarningList.txt'.format(self._out_path),
-        ]
-        exec_command(cmd, log_path=self._log_path)
+        hit_rate = stats['hit_rate'] or 0
+        hb_info(f'ccache: {stats["total"]} compiles, '
+                f'hit rate {hit_rate:.2%}, '
+                f'uncacheable {stats["uncacheable_rate"]:.2%}')
+        for reason, count in list(stats['reasons'].items())[:3]:
+            hb_info(f'ccache uncacheable: {reason}: {count}')
+        hb_info(f'ccache stats: '
+                f'{os.path.join(self._out_path, CCACHE_STATS)}')
 
     def generate_ninja_trace(self, start_time):
-        def get_unixtime(dt):
-            epoch = datetime.utcfromtimestamp(0)
-            unixtime = '%f' % ((dt - epoch).total_seconds() * 10**9)
-            return str(unixtime)
-
-        cmd = [
-            'python3',
-            '{}/build/scripts/ninja2trace.py'.format(self._root_path),
-            '--ninja-log',
-            '{}/.ninja_log'.format(self._out_path),
-            "--trace-file",
-            "{}/build.trace".format(self._out_path),
-            "--ninja-start-time",
-            get_unixtime(start_time),
-            "--duration-file",
-            "{}/sorted_action_duration.txt".format(self._out_path),
-        ]
-        exec_command(cmd, log_path=self._log_path)
+        ninja_log = os.path.join(self._out_path, '.ninja_log')
+        if not os.path.isfile(ninja_log):
+            hb_warning(f'{ninja_log} not found, skip ninja trace')
+            return
+        analyzer = NinjaLogAnalyzer(ninja_log, start_time)
+        analyzer.analyze(
+            os.path.join(self._out_path, 'build.trace'),
+            os.path.join(self._out_path, 'sorted_action_duration.txt'),
+            os.path.join(self._out_path, 'ninja_cost_rollup.json'))
 
     def compute_overlap_rate(self):
-        conf = Config()
+        conf = self._config
         subsystem_config_overlay_path = conf.product_path + '/subsystem_config_overlay.json'
         if os.path.isfile(subsystem_config_overlay_path):
             cmd = [
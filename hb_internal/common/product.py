@@ -21,6 +21,8 @@ from collections import defaultdict
 from hb_internal.common.utils import read_json_file
 from hb_internal.common.utils import OHOSException
 from hb_internal.common.config import Config
+from hb_internal.common.product_index import ProductIndex
+from hb_internal.common.product_index import PRODUCT_INDEX
 from hb_internal.cts.menuconfig import Menuconfig
 from hb_internal.cts.common import Separator
 from hb_internal.preloader.parse_vendor_product_config import get_vendor_parts_list
@@ -29,21 +31,31 @@ class Product():
     @staticmethod
     def get_products():
         config = Config()
+        index = Product._product_index(config)
+        products = list(Product._scan_products(config, index))
+        index.set_products(products)
+        index.save()
+        yield from products
+
+    @staticmethod
+    def _product_index(config):
+        return ProductIndex.get(
+            os.path.join(config.root_path, 'out', PRODUCT_INDEX))
+
+    @staticmethod
+    def _scan_products(config, index):
         # ext products configuration
         _ext_scan_path = os.path.join(config.root_path,
                                       'out/products_ext/vendor')
         if os.path.exists(_ext_scan_path):
-            for company in os.listdir(_ext_scan_path):
+            for company in index.listdir(_ext_scan_path, only_dirs=True):
                 company_path = os.path.join(_ext_scan_path, company)
-                if not os.path.isdir(company_path):
-                    continue
-
-                for product in os.listdir(company_path):
+                for product in index.listdir(company_path):
                     p_config_path = os.path.join(company_path, product)
                     config_path = os.path.join(p_config_path, 'config.json')
 
-                    if os.path.isfile(config_path):
-                        info = read_json_file(config_path)
+                    info = index.read_config(config_path)
+                    if info is not None:
                         product_name = info.get('product_name')
                         if info.get('product_path'):
                             product_path = os.path.join(
@@ -83,18 +95,14 @@ class Product():
                                     'component_type': info.get('component_type', '')
                                 }
         if config.vendor_path != '':
-            for company in os.listdir(config.vendor_path):
+            for company in index.listdir(config.vendor_path, only_dirs=True):
                 company_path = os.path.join(config.vendor_path, company)
-                if not os.path.isdir(company_path):
-                    continue
-
-
-                for product in os.listdir(company_path):
+                for product in index.listdir(company_path):
                     product_path = os.path.join(company_path, product)
                     config_path = os.path.join(product_path, 'config.json')
 
-                    if os.path.isfile(config_path):
-                        info = read_json_file(config_path)
+                    info = index.read_config(config_path)
+                    if info is not None:
                         product_name = info.get('product_name')
                         if product_name is not None:
                             yield {
@@ -108,13 +116,13 @@ class Product():
                                 'component_type': info.get('component_type', '')
                             }
         bip_path = config.built_in_product_path
-        for item in os.listdir(bip_path):
+        for item in index.listdir(bip_path):
             if item[0] in ".":
                 continue
             else:
                 product_name = item[0:-len('.json')] if item.endswith('.json') else item
                 config_path = os.path.join(bip_path, item)
-                info = read_json_file(config_path)
+                info = index.read_config(config_path)
                 yield {
                     'company': 'built-in',
                     "name": product_name,
@@ -228,16 +236,22 @@ class Product():
 
     @staticmethod
     def get_product_info(product_name, company=None):
-        for product_info in Product.get_products():
-            cur_company = product_info['company']
-            cur_product = product_info['name']
-            if company:
-                if cur_company == company and cur_product == product_name:
-                    return product_info
-            else:
-                if cur_product == product_name:
-                    return product_info
+        # name@company keys, and plain names for the first product of
+        # that name in scan order. The products of the last scan are
+        # used unless a product dir or the config found changed, a
+        # missing product scans again before giving up.
+        config = Config()
+        index = Product._product_index(config)
+        key = f'{product_name}@{company}' if company else product_name
+        products = index.products()
+        if products is not None and key in products and \
+                not index.config_changed(products[key]['config']):
+            return dict(products[key])
 
+        products = index.set_products(Product._scan_products(config, index))
+        index.save()
+        if key in products:
+            return dict(products[key])
         raise OHOSException(f'product {product_name}@{company} not found')
 
     @staticmethod
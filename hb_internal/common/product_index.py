@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import json
+
+from hb_internal.common.utils import read_json_file
+
+PRODUCT_INDEX = 'hb_product_index.json'
+PRODUCT_INDEX_VERSION = 2
+
+# Fields of a product config.json the product list is made of.
+CONFIG_FIELDS = ('product_name', 'product_path', 'version', 'type',
+                 'build_out_path', 'subsystem_config_json', 'component_type')
+
+
+class ProductIndex():
+    """On-disk cache of the product directories and config files.
+
+    Directory listings are reused while the directory mtime is unchanged
+    and config files are only parsed again when their mtime or size
+    changed, so listing products costs a few stats instead of parsing
+    every config.json. The products found by the last scan are kept by
+    name@company and by name, they are valid until a scanned directory
+    changes.
+    """
+    _instances = {}
+
+    def __init__(self, index_file):
+        self._index_file = index_file
+        self._dirs = {}
+        self._configs = {}
+        self._products = None
+        self._seen = set()
+        self._modified = False
+        self._load()
+
+    @classmethod
+    def get(cls, index_file):
+        """Return the index of index_file, loaded once per process."""
+        if index_file not in cls._instances:
+            cls._instances[index_file] = cls(index_file)
+        return cls._instances[index_file]
+
+    def _load(self):
+        try:
+            with open(self._index_file, 'rt', encoding='utf-8') as index:
+                data = json.load(index)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != PRODUCT_INDEX_VERSION:
+            return
+        self._dirs = data.get('dirs', {})
+        self._configs = data.get('configs', {})
+        self._products = data.get('products')
+
+    def save(self):
+        """Write the index, dropping the entries not used since loading."""
+        for entries in (self._dirs, self._configs):
+            for key in set(entries) - self._seen:
+                del entries[key]
+                self._modified = True
+        if not self._modified:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._index_file), exist_ok=True)
+            tmp_file = f'{self._index_file}.tmp'
+            with open(tmp_file, 'wt', encoding='utf-8') as index:
+                json.dump({'version': PRODUCT_INDEX_VERSION,
+                           'dirs': self._dirs,
+                           'configs': self._configs,
+                           'products': self._products}, index)
+            os.replace(tmp_file, self._index_file)
+            self._modified = False
+        except OSError:
+            # The index is only a cache, the next call scans again.
+            pass
+
+    def listdir(self, path, only_dirs=False):
+        """os.listdir, cached until the mtime of path changes."""
+        mtime = os.stat(path).st_mtime_ns
+        key = f'{path}/' if only_dirs else path
+        self._seen.add(key)
+        cached = self._dirs.get(key)
+        if cached is not None and cached['mtime'] == mtime:
+            return cached['entries']
+        entries = os.listdir(path)
+        if only_dirs:
+            entries = [entry for entry in entries
+                       if os.path.isdir(os.path.join(path, entry))]
+        self._dirs[key] = {'mtime': mtime, 'entries': entries}
+        self._modified = True
+        return entries
+
+    def read_config(self, config_path):
+        """Return CONFIG_FIELDS of config_path, None if it is no file."""
+        try:
+            stat = os.stat(config_path)
+        except OSError:
+            return None
+        self._seen.add(config_path)
+        cached = self._configs.get(config_path)
+        if cached is not None and cached['mtime'] == stat.st_mtime_ns and \
+                cached['size'] == stat.st_size:
+            return cached['info']
+        info = read_json_file(config_path, cache=False)
+        info = {field: info[field] for field in CONFIG_FIELDS
+                if field in info}
+        self._configs[config_path] = {'mtime': stat.st_mtime_ns,
+                                      'size': stat.st_size,
+                                      'info': info}
+        self._modified = True
+        return info
+
+    def config_changed(self, config_path):
+        """Return whether config_path changed since it was last read."""
+        cached = self._configs.get(config_path)
+        if cached is None:
+            return True
+        try:
+            stat = os.stat(config_path)
+        except OSError:
+            return True
+        return cached['mtime'] != stat.st_mtime_ns or \
+            cached['size'] != stat.st_size
+
+    def products(self):
+        """Return the products of the last scan by name@company and name.
+
+        None if there was no scan yet or a scanned directory changed.
+        """
+        if self._products is None:
+            return None
+        for key, cached in self._dirs.items():
+            try:
+                mtime = os.stat(key.rstrip('/') or '/').st_mtime_ns
+            except OSError:
+                return None
+            if mtime != cached['mtime']:
+                return None
+        return self._products
+
+    def set_products(self, products):
+        """Keep products of a scan, the first of a name wins the name."""
+        self._products = {}
+        for product_info in products:
+            name = product_info['name']
+            self._products.setdefault(f'{name}@{product_info["company"]}',
+                                      product_info)
+            self._products.setdefault(name, product_info)
+        self._modified = True
+        return self._products
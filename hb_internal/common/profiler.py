@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import io
+import pstats
+import cProfile
+import tracemalloc
+
+from hb_internal.common.utils import hb_info
+from hb_internal.common.utils import parsed_file_cache
+
+PROFILE_STATS = 'hb_profile.prof'
+PROFILE_REPORT = 'hb_profile.txt'
+MEMORY_REPORT = 'hb_memory.txt'
+REPORT_LINES = 50
+
+
+class Profiler():
+    """Profile hb itself with cProfile and tracemalloc.
+
+    Time spent waiting for gn and ninja shows up under the subprocess
+    and log pump functions, so hb's own overhead is what remains.
+    """
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self._running = False
+
+    def start(self):
+        tracemalloc.start()
+        self._profile.enable()
+        self._running = True
+
+    def stop(self, out_path):
+        if not self._running:
+            return
+        self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self._running = False
+
+        os.makedirs(out_path, exist_ok=True)
+        stats_file = os.path.join(out_path, PROFILE_STATS)
+        self._profile.dump_stats(stats_file)
+        report = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=report)
+        stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+        stats.sort_stats('tottime').print_stats(REPORT_LINES)
+        cache_stats = parsed_file_cache.stats()
+        with open(os.path.join(out_path, PROFILE_REPORT), 'wt',
+                  encoding='utf-8') as report_file:
+            report_file.write(
+                'parsed file cache: {hits} hits, {misses} misses, '
+                '{bytes_saved} bytes not parsed again\n\n'.format(
+                    **cache_stats))
+            report_file.write(report.getvalue())
+
+        memory_file = os.path.join(out_path, MEMORY_REPORT)
+        with open(memory_file, 'wt', encoding='utf-8') as memory:
+            memory.write(f'current: {current / 1024:.1f}KB\n'
+                         f'peak: {peak / 1024:.1f}KB\n\n')
+            for stat in snapshot.statistics('lineno')[:REPORT_LINES]:
+                memory.write(f'{stat}\n')
+        hb_info(f'profile: {stats_file}, peak memory {peak / 1024:.1f}KB')
+        hb_info(f'parsed file cache: {cache_stats["hits"]} hits, '
+                f'{cache_stats["bytes_saved"] / 1024:.1f}KB saved')
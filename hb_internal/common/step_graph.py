@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import io
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+from hb_internal.common.utils import hb_info
+from hb_internal.common.utils import hb_error
+from hb_internal.common.utils import hb_warning
+from hb_internal.common.build_events import EventSink
+
+
+class ThreadOutput():
+    """Stand-in for sys.stdout or sys.stderr capturing output per thread.
+
+    buffers map a capturing thread to its (stdout, stderr) buffers, index
+    picks the one of this stream. Threads which did not start a capture
+    write to the original stream. A thread with a parent_thread
+    attribute, eg: the console renderer of a log pump, writes where its
+    parent does.
+    """
+    def __init__(self, stream, buffers, index):
+        self._stream = stream
+        self._buffers = buffers
+        self._index = index
+
+    def _target(self):
+        thread = threading.current_thread()
+        while thread not in self._buffers and \
+                hasattr(thread, 'parent_thread'):
+            thread = thread.parent_thread
+        buffers = self._buffers.get(thread)
+        if buffers is None:
+            return self._stream
+        return buffers[self._index]
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+# The capturing thread -> its stdout and stderr buffers, shared by all
+# the thread_output() blocks of the process.
+_buffers = {}
+_output_lock = threading.Lock()
+_output_users = 0
+_saved_streams = None
+
+
+@contextmanager
+def thread_output():
+    """Keep ThreadOutput as sys.stdout and sys.stderr in the block.
+
+    Builds in parallel threads run their step graphs at the same time, so
+    the streams are replaced once for the process by the first block and
+    put back by the last one to end, whatever order they end in. Yield
+    the dict mapping a capturing thread to its stdout and stderr buffers.
+    """
+    global _output_users, _saved_streams
+    with _output_lock:
+        if not _output_users:
+            _saved_streams = sys.stdout, sys.stderr
+            sys.stdout = ThreadOutput(_saved_streams[0], _buffers, 0)
+            sys.stderr = ThreadOutput(_saved_streams[1], _buffers, 1)
+        _output_users += 1
+    try:
+        yield _buffers
+    finally:
+        with _output_lock:
+            _output_users -= 1
+            if not _output_users:
+                sys.stdout, sys.stderr = _saved_streams
+                _saved_streams = None
+
+
+class StepGraph():
+    """Run steps concurrently, each as soon as the steps it needs are done.
+
+    The output of every step is captured and printed in one piece when
+    the step ends, so concurrent steps do not mix their lines. stdout and
+    stderr are captured apart and each is replayed to its stream. A step
+    whose dependency failed is skipped.
+    """
+    def __init__(self, event_sink=None, max_workers=None):
+        self._event_sink = event_sink if event_sink is not None \
+            else EventSink()
+        self._max_workers = max_workers
+        self._steps = {}
+
+    def add(self, name, func, deps=()):
+        """Add a step, deps are names of steps added before."""
+        for dep in deps:
+            if dep not in self._steps:
+                raise ValueError(f'{name} depends on unknown step {dep}')
+        self._steps[name] = (func, tuple(deps))
+
+    def run(self):
+        """Run all the steps, return the names of those which failed."""
+        if not self._steps:
+            return []
+        done = set()
+        failed = []
+        pending = dict(self._steps)
+        with thread_output() as buffers, ThreadPoolExecutor(
+                max_workers=self._max_workers or len(pending)) as executor:
+            running = {}
+            while pending or running:
+                for name, (func, deps) in list(pending.items()):
+                    if any(dep in failed for dep in deps):
+                        del pending[name]
+                        failed.append(name)
+                        hb_warning(f'{name} skipped, a step it needs failed')
+                    elif all(dep in done for dep in deps):
+                        del pending[name]
+                        future = executor.submit(self._run_step, name, func,
+                                                 buffers)
+                        running[future] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    output, errors, duration, exception = future.result()
+                    sys.stdout.write(output)
+                    sys.stderr.write(errors)
+                    if exception is None:
+                        done.add(name)
+                        hb_info(f'{name} done in {duration:.3f}s')
+                    else:
+                        failed.append(name)
+                        hb_error(f'{name} failed in {duration:.3f}s: '
+                                 f'{exception}')
+        return failed
+
+    def _run_step(self, name, func, buffers):
+        thread = threading.current_thread()
+        buffers[thread] = (io.StringIO(), io.StringIO())
+        start = time.perf_counter()
+        exception = None
+        try:
+            with self._event_sink.phase(name):
+                func()
+        except Exception as step_exception:
+            exception = step_exception
+        finally:
+            output, errors = (buffer.getvalue()
+                              for buffer in buffers.pop(thread))
+        return output, errors, time.perf_counter() - start, exception
@@ -17,7 +17,7 @@
 #
 
 import os
-import re
+import copy
 import subprocess
 import shutil
 import sys
@@ -25,8 +25,13 @@ import json
 import tarfile
 import zipfile
 import importlib
+import threading
 from datetime import datetime
 from collections import namedtuple
+from collections import OrderedDict
+
+from hb_internal.common.log_pump import LogPump
+from hb_internal.common.log_pump import FailureIndexer
 
 
 def encode(data, encoding='utf-8'):
@@ -47,33 +52,178 @@ def remove_path(path):
 
 
 # Read json file data
-def read_json_file(input_file):
+class ReadOnlyDict(dict):
+    """dict shared through the parsed file cache, copy it to modify."""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('parsed config is read-only, copy it with dict()')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (ReadOnlyDict, (dict(self), ))
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+
+class ReadOnlyList(list):
+    """list shared through the parsed file cache, copy it to modify."""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('parsed config is read-only, copy it with list()')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = clear = extend = insert = pop = remove = reverse = sort = \
+        _readonly
+
+    def __reduce__(self):
+        return (ReadOnlyList, (list(self), ))
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list(self), memo)
+
+
+def _read_only(data):
+    if isinstance(data, dict):
+        return ReadOnlyDict((key, _read_only(value))
+                            for key, value in data.items())
+    if isinstance(data, list):
+        return ReadOnlyList(_read_only(value) for value in data)
+    return data
+
+
+class ParsedFileCache():
+    """Process wide cache of parsed json and yaml files.
+
+    Entries are keyed by realpath and checked against the mtime and size
+    of the file, they are shared between callers as read-only views.
+    Files written through dump_json_file or write_file_if_changed are
+    dropped from the cache right away. The least recently used entries
+    are dropped once the cached files add up to more than max_bytes.
+    The cache is shared by the threads of a build, every access holds
+    its lock.
+    """
+    def __init__(self, max_bytes=64 << 20):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def load(self, input_file, loader):
+        path = os.path.realpath(input_file)
+        with self._lock:
+            stat = os.stat(path)
+            key = (stat.st_mtime_ns, stat.st_size)
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                self.bytes_saved += stat.st_size
+                return entry[1]
+            self.misses += 1
+            data = _read_only(loader(path))
+            self._drop(path)
+            if stat.st_size <= self._max_bytes:
+                self._entries[path] = (key, data)
+                self._bytes += stat.st_size
+                while self._bytes > self._max_bytes:
+                    self._drop(next(iter(self._entries)))
+            return data
+
+    def _drop(self, path):
+        # Called with the lock held.
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[0][1]
+
+    def invalidate(self, input_file):
+        path = os.path.realpath(input_file)
+        with self._lock:
+            self._drop(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'bytes_saved': self.bytes_saved}
+
+
+parsed_file_cache = ParsedFileCache()
+
+
+def _load_json(input_file):
+    with open(input_file, 'rb') as input_f:
+        return json.load(input_f)
+
+
+def read_json_file(input_file, cache=True):
+    """Return the parsed input_file.
+
+    Cached files are shared read-only views, files read once, eg: the
+    module infos of a build, are better read with cache=False which
+    returns a plain, mutable document.
+    """
     if not os.path.isfile(input_file):
         raise OHOSException(f'{input_file} not found')
 
-    with open(input_file, 'rb') as input_f:
-        data = json.load(input_f)
-        return data
+    if not cache:
+        return _load_json(input_file)
+    return parsed_file_cache.load(input_file, _load_json)
 
 
 def dump_json_file(dump_file, json_data):
+    parsed_file_cache.invalidate(dump_file)
     with open(dump_file, 'wt', encoding='utf-8') as json_file:
         json.dump(json_data, json_file, ensure_ascii=False, indent=2)
 
 
+def write_file_if_changed(output_file, content):
+    """Write content to output_file unless it already holds it.
+
+    An unchanged file keeps its mtime, so gn and ninja do not see it as
+    modified. Return whether the file was written.
+    """
+    if os.path.isfile(output_file):
+        with open(output_file, 'rt', encoding='utf-8') as output_f:
+            if output_f.read() == content:
+                return False
+    parsed_file_cache.invalidate(output_file)
+    with open(output_file, 'wt', encoding='utf-8') as output_f:
+        output_f.write(content)
+    return True
+
+
 def read_yaml_file(input_file):
     if not os.path.isfile(input_file):
         raise OHOSException(f'{input_file} not found')
 
     yaml = importlib.import_module('yaml')
-    with open(input_file, 'rt', encoding='utf-8') as yaml_file:
-        try:
-            return yaml.safe_load(yaml_file)
-        except yaml.YAMLError as exc:
-            if hasattr(exc, 'problem_mark'):
-                mark = exc.problem_mark
-                raise OHOSException(f'{input_file} load failed, error line:'
-                                    f' {mark.line + 1}:{mark.column + 1}')
+
+    def load_yaml(path):
+        with open(path, 'rt', encoding='utf-8') as yaml_file:
+            try:
+                return yaml.safe_load(yaml_file)
+            except yaml.YAMLError as exc:
+                if hasattr(exc, 'problem_mark'):
+                    mark = exc.problem_mark
+                    raise OHOSException(f'{input_file} load failed, error '
+                                        f'line: {mark.line + 1}:'
+                                        f'{mark.column + 1}')
+    return parsed_file_cache.load(input_file, load_yaml)
 
 
 def get_input(msg):
@@ -85,50 +235,42 @@ def get_input(msg):
 
 
 def exec_command(cmd, log_path='out/build.log', **kwargs):
-    useful_info_pattern = re.compile(r'\[\d+/\d+\].+')
     is_log_filter = kwargs.pop('log_filter', False)
+    event_sink = kwargs.pop('event_sink', None)
+    listeners = kwargs.pop('listeners', [])
+    failure_indexer = FailureIndexer()
 
-    with open(log_path, 'at', encoding='utf-8') as log_file:
+    with open(log_path, 'ab') as log_file:
         process = subprocess.Popen(cmd,
                                    stdout=subprocess.PIPE,
                                    stderr=subprocess.STDOUT,
-                                   encoding='utf-8',
                                    **kwargs)
-        for line in iter(process.stdout.readline, ''):
-            if is_log_filter:
-                info = re.findall(useful_info_pattern, line)
-                if len(info):
-                    hb_info(info[0])
-            else:
-                hb_info(line)
-            log_file.write(line)
+        pump = LogPump(process.stdout, log_file,
+                       log_filter=is_log_filter,
+                       render=lambda line: message('info', line))
+        if is_log_filter:
+            pump.add_listener(failure_indexer)
+            if event_sink is not None and event_sink.enabled:
+                pump.add_listener(event_sink.progress_listener())
+        for listener in listeners:
+            pump.add_listener(listener)
+        pump.run()
 
     process.wait()
     ret_code = process.returncode
 
     if ret_code != 0:
         if is_log_filter:
-            get_failed_log(log_path)
+            get_failed_log(log_path, failure_indexer)
 
         raise OHOSException('Please check build log in {}'.format(log_path))
 
 
-def get_failed_log(log_path):
-    with open(log_path, 'rt', encoding='utf-8') as log_file:
-        data = log_file.read()
-    failed_pattern = re.compile(
-        r'(\[\d+/\d+\].*?)(?=\[\d+/\d+\]|'
-        'ninja: build stopped)', re.DOTALL)
-    failed_log = failed_pattern.findall(data)
-    for log in failed_log:
-        if 'FAILED:' in log:
+def get_failed_log(log_path, failure_indexer):
+    with open(log_path, 'rb') as log_file:
+        for log in failure_indexer.read(log_file):
             hb_error(log)
 
-    failed_pattern = re.compile(r'(ninja: error:.*?)\n', re.DOTALL)
-    failed_log = failed_pattern.findall(data)
-    for log in failed_log:
-        hb_error(log)
-
     error_log = os.path.join(os.path.dirname(log_path), 'error.log')
     if os.path.isfile(error_log):
         with open(error_log, 'rt', encoding='utf-8') as log_file:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import json
+from collections import Counter
+
+from hb_internal.common.log_pump import PROGRESS_PATTERN
+from hb_internal.common.log_pump import last_progress
+
+WARNING_LIST = 'packages/WarningList.txt'
+WARNING_SUMMARY = 'packages/WarningSummary.json'
+SUMMARY_TOP = 50
+
+# eg: ../../foo/bar.c:12:5: warning: unused variable 'x' [-Wunused-variable]
+WARNING_PATTERN = re.compile(
+    rb'^(?P<file>[^\s:][^:]*):(?P<line>\d+):(?:(?P<column>\d+):)? '
+    rb'warning: (?P<message>.*?)(?: \[(?P<flag>-W[^\]]+)\])?\s*$')
+
+# Non-verbose ninja progress line, eg: [12/3456] CXX obj/foo/bar.o
+# With -v ninja prints the whole command instead of the description.
+TARGET_PATTERN = re.compile(r'\[\d+/\d+\] \S+ (\S+)')
+
+
+class WarningCollector():
+    """Log pump listener collecting compiler warnings as they stream.
+
+    A warning is attributed to the target of the ninja progress line
+    before it, ninja prints the output of an edge after its description.
+    Verbose builds print commands instead, their warnings are attributed
+    to no target. Warnings of a header seen by several compiles are kept
+    once.
+    """
+    def __init__(self, root_path, out_path):
+        self._root_path = root_path
+        self._out_path = out_path
+        self._seen = set()
+        self._target = None
+        self.warnings = []
+        self.by_file = Counter()
+        self.by_flag = Counter()
+        self.by_target = Counter()
+
+    def feed(self, block, offset):
+        if b'warning:' not in block:
+            # Fast path, only remember the target of the last edge.
+            progress = last_progress(block)
+            if progress is not None:
+                self._target = progress.group()
+            return
+        for line in block.splitlines():
+            progress = PROGRESS_PATTERN.search(line)
+            if progress is not None:
+                self._target = progress.group()
+                continue
+            match = WARNING_PATTERN.match(line)
+            if match is not None:
+                self._add(match)
+
+    def _add(self, match):
+        fields = {name: value.decode('utf-8', errors='replace')
+                  for name, value in match.groupdict(b'').items()}
+        path = fields['file']
+        if not os.path.isabs(path):
+            path = os.path.join(self._out_path, path)
+        path = os.path.normpath(path)
+        if path.startswith(os.path.join(self._root_path, '')):
+            path = os.path.relpath(path, self._root_path)
+        key = (path, fields['line'], fields['column'], fields['flag'],
+               fields['message'])
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        target = self._target_name()
+        self.warnings.append((path, fields, target))
+        self.by_file[path] += 1
+        self.by_flag[fields['flag'] or 'no flag'] += 1
+        self.by_target[target] += 1
+
+    def _target_name(self):
+        if self._target is None:
+            return 'unknown'
+        # [12/3456] CXX obj/foo/bar.o -> obj/foo/bar.o
+        description = self._target.decode('utf-8', errors='replace')
+        match = TARGET_PATTERN.fullmatch(description.strip())
+        if match is None:
+            return 'unknown'
+        return match.group(1)
+
+    def close(self):
+        pass
+
+    def write(self):
+        """Write WARNING_LIST and WARNING_SUMMARY under out_path.
+
+        WARNING_LIST keeps the lines of the compiler, the targets are only
+        counted in WARNING_SUMMARY.
+        """
+        warning_list = os.path.join(self._out_path, WARNING_LIST)
+        os.makedirs(os.path.dirname(warning_list), exist_ok=True)
+        with open(warning_list, 'wt', encoding='utf-8') as list_file:
+            for path, fields, _ in sorted(
+                    self.warnings,
+                    key=lambda warning: (warning[0],
+                                         int(warning[1]['line']))):
+                location = ':'.join(
+                    part for part in (path, fields['line'], fields['column'])
+                    if part)
+                flag = f' [{fields["flag"]}]' if fields['flag'] else ''
+                list_file.write(f'{location}: warning: {fields["message"]}'
+                                f'{flag}\n')
+        summary = {
+            'total': len(self.warnings),
+            'flags': dict(self.by_flag.most_common()),
+            'files': dict(self.by_file.most_common(SUMMARY_TOP)),
+            'targets': dict(self.by_target.most_common(SUMMARY_TOP)),
+        }
+        with open(os.path.join(self._out_path, WARNING_SUMMARY), 'wt',
+                  encoding='utf-8') as summary_file:
+            json.dump(summary, summary_file, indent=2)
+        return warning_list
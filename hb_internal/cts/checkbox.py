@@ -18,13 +18,13 @@
 
 from __future__ import print_function
 from __future__ import unicode_literals
-from collections import defaultdict
 
 from prompt_toolkit.application import Application
 from prompt_toolkit.key_binding.manager import KeyBindingManager
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.layout.containers import Window
 from prompt_toolkit.filters import IsDone
+from prompt_toolkit.filters import Condition
 from prompt_toolkit.layout.controls import TokenListControl
 from prompt_toolkit.layout.containers import ConditionalContainer
 from prompt_toolkit.layout.containers import ScrollOffsets
@@ -34,19 +34,25 @@ from prompt_toolkit.token import Token
 
 from hb_internal.cts.common import get_style
 from hb_internal.cts.common import if_mousedown
-from hb_internal.cts.common import select_node
-from hb_internal.cts.common import deselect_node
+from hb_internal.cts.common import Selection
 from hb_internal.cts.common import Separator
+from hb_internal.cts.common import ChoiceFilter
+from hb_internal.cts.common import Viewport
+from hb_internal.cts.common import next_row
 
 
 class InquirerControl(TokenListControl):
     def __init__(self, choices, **kwargs):
         self.pointer_index = 0
-        self.selected_options = []  # list of names
+        self.deps = kwargs.pop('deps')
+        self.selected_options = Selection(self.deps)  # set of names
         self.answered = False
         self._init_choices(choices)
-        self.deps = kwargs.pop('deps')
-        self.nodes_from = defaultdict(list)
+        self.choice_filter = ChoiceFilter(
+            [None if isinstance(choice, Separator) else choice[0]
+             for choice in self.choices])
+        self.viewport = Viewport()
+        self._row_tokens = {}  # index -> (row state, tokens)
         super(InquirerControl, self).__init__(self._get_choice_tokens,
                                               **kwargs)
 
@@ -62,7 +68,7 @@ class InquirerControl(TokenListControl):
                 value = choice.get('value', name)
                 disabled = choice.get('disabled', None)
                 if 'checked' in choice and choice['checked'] and not disabled:
-                    self.selected_options.append(choice['name'])
+                    self.selected_options.select(choice['name'])
                 self.choices.append((name, value, disabled))
                 if searching_first_choice and not disabled:
                     self.pointer_index = index
@@ -72,53 +78,77 @@ class InquirerControl(TokenListControl):
     def choice_count(self):
         return len(self.choices)
 
+    def is_enabled(self, index):
+        choice = self.choices[index]
+        return not isinstance(choice, Separator) and not choice[2]
+
+    def move_pointer(self, step):
+        index = next_row(self.choice_filter.matches, self.pointer_index,
+                         step, self.is_enabled)
+        if index is not None:
+            self.pointer_index = index
+
+    def follow_filter(self):
+        # Keep the pointer on a choice the filter shows.
+        if not self.choice_filter.shows(self.pointer_index):
+            self.move_pointer(1)
+
     def _get_choice_tokens(self, cli):
+        # Only the rows on screen are rendered, a row is rebuilt when its
+        # checked or pointed at state changed.
+        tokens = []
+        for index in self.viewport.visible(cli, self.choice_filter.matches,
+                                           self.pointer_index):
+            choice = self.choices[index]
+            if isinstance(choice, Separator):
+                state = None
+            else:
+                state = (choice[1] in self.selected_options,
+                         index == self.pointer_index)
+            cached = self._row_tokens.get(index)
+            if cached is None or cached[0] != state:
+                cached = self._row_tokens[index] = (
+                    state, self._get_row_tokens(choice, state))
+            tokens.extend(cached[1])
+        if tokens:
+            tokens.pop()  # Remove last newline.
+        return tokens
+
+    def _get_row_tokens(self, choice, state):
         tokens = []
         token = Token
+        if isinstance(choice, Separator):
+            tokens.append((token.Separator, '  %s\n' % choice))
+            return tokens
+
+        line_name = choice[0]
+        line_value = choice[1]
+        selected, pointed_at = state
 
-        def append(index, line):
-            if isinstance(line, Separator):
-                tokens.append((token.Separator, '  %s\n' % line))
+        @if_mousedown
+        def select_item(cli, mouse_event):
+            # bind option with this index to mouse event
+            self.selected_options.toggle(line_value)
+
+        if pointed_at:
+            tokens.append((token.Pointer, '    \u276f', select_item))
+        else:
+            tokens.append((token, '     ', select_item))
+        # 'o ' - FISHEYE
+        if choice[2]:  # disabled
+            tokens.append((token, '- %s (%s)' %
+                          (choice[0], choice[2])))
+        else:
+            if selected:
+                tokens.append((token.Selected, '\u25cf ', select_item))
             else:
-                line_name = line[0]
-                line_value = line[1]
-                selected = (line_value in self.selected_options)
-                pointed_at = (index == self.pointer_index)
-
-                @if_mousedown
-                def select_item(cli, mouse_event):
-                    # bind option with this index to mouse event
-                    if line_value in self.selected_options:
-                        deselect_node(line_value, self.selected_options,
-                                      self.nodes_from, self.deps)
-                    else:
-                        select_node(line_value, self.selected_options,
-                                    self.nodes_from, self.deps)
-
-                if pointed_at:
-                    tokens.append((token.Pointer, '    \u276f', select_item))
-                else:
-                    tokens.append((token, '     ', select_item))
-                # 'o ' - FISHEYE
-                if choice[2]:  # disabled
-                    tokens.append((token, '- %s (%s)' %
-                                  (choice[0], choice[2])))
-                else:
-                    if selected:
-                        tokens.append((token.Selected, '\u25cf ', select_item))
-                    else:
-                        tokens.append((token, '\u25cb ', select_item))
-
-                    if pointed_at:
-                        tokens.append((Token.SetCursorPosition, ''))
-
-                    tokens.append((token, line_name, select_item))
-                tokens.append((token, '\n'))
-
-        # prepare the select choices
-        for i, choice in enumerate(self.choices):
-            append(i, choice)
-        tokens.pop()  # Remove last newline.
+                tokens.append((token, '\u25cb ', select_item))
+
+            if pointed_at:
+                tokens.append((Token.SetCursorPosition, ''))
+
+            tokens.append((token, line_name, select_item))
+        tokens.append((token, '\n'))
         return tokens
 
     def get_selected_values(self):
@@ -145,6 +175,8 @@ def question(message, **kwargs):
         inquirer_control = InquirerControl(choices, deps=deps)
 
     qmark = kwargs.pop('qmark', '?')
+    choice_filter = inquirer_control.choice_filter
+    filtering = Condition(lambda cli: choice_filter.filtering)
 
     def get_prompt_tokens(cli):
         tokens = []
@@ -157,14 +189,16 @@ def question(message, **kwargs):
                 tokens.append((Token.Answer, ' done'))
             elif nbr_selected == 1:
                 tokens.append((Token.Answer, ' [%s]' %
-                               inquirer_control.selected_options[0]))
+                               next(iter(inquirer_control.selected_options))))
             else:
                 tokens.append((Token.Answer,
                                ' done (%d selections)' % nbr_selected))
+        elif choice_filter.filtering or choice_filter.text:
+            tokens.append((Token.Instruction, ' /%s' % choice_filter.text))
         else:
             tokens.append((Token.Instruction,
                            ' (<up>, <down> to move, <space> to select, <a> '
-                           'to toggle, <i> to invert)'))
+                           'to toggle, <i> to invert, </> to filter)'))
         return tokens
 
     # assemble layout
@@ -191,64 +225,72 @@ def question(message, **kwargs):
     def _(event):
         raise KeyboardInterrupt()
 
-    @manager.registry.add_binding(' ', eager=True)
+    @manager.registry.add_binding(' ', filter=~filtering, eager=True)
     def toggle(event):
         pointer_index = inquirer_control.pointer_index
+        if not choice_filter.shows(pointer_index):
+            return
         pointed_choice = inquirer_control.choices[pointer_index][1]  # value
-        if pointed_choice in inquirer_control.selected_options:
-            deselect_node(pointed_choice, inquirer_control.selected_options,
-                          inquirer_control.nodes_from, deps)
-        else:
-            select_node(pointed_choice, inquirer_control.selected_options,
-                        inquirer_control.nodes_from, deps)
+        inquirer_control.selected_options.toggle(pointed_choice)
 
-    @manager.registry.add_binding('i', eager=True)
+    @manager.registry.add_binding('i', filter=~filtering, eager=True)
     def invert(event):
-        inverted_selection = [c[1] for c in inquirer_control.choices if
-                              not isinstance(c, Separator) and
-                              c[1] not in inquirer_control.selected_options and
-                              not c[2]]
-        inquirer_control.selected_options = inverted_selection
-
-    @manager.registry.add_binding('a', eager=True)
+        choices = inquirer_control.choices
+        inverted_selection = [choices[index][1] for index in
+                              choice_filter.matches
+                              if inquirer_control.is_enabled(index) and
+                              choices[index][1] not in
+                              inquirer_control.selected_options]
+        inquirer_control.selected_options.reset(inverted_selection)
+
+    @manager.registry.add_binding('a', filter=~filtering, eager=True)
     def select_all(event):
         all_selected = True  # all choices have been selected
-        for choice in inquirer_control.choices:
-            if not isinstance(choice, Separator) and \
-                    choice[1] not in inquirer_control.selected_options and \
-                    not choice[2]:
+        for index in choice_filter.matches:
+            choice = inquirer_control.choices[index]
+            if inquirer_control.is_enabled(index) and \
+                    choice[1] not in inquirer_control.selected_options:
                 # add missing ones
-                inquirer_control.selected_options.append(choice[1])
+                inquirer_control.selected_options.select(choice[1])
                 all_selected = False
         if all_selected:
-            inquirer_control.selected_options = []
+            inquirer_control.selected_options.clear()
+
+    @manager.registry.add_binding('/', filter=~filtering, eager=True)
+    def start_filter(event):
+        choice_filter.filtering = True
+
+    @manager.registry.add_binding(Keys.Any, filter=filtering, eager=True)
+    def type_filter(event):
+        if event.data.isprintable():
+            choice_filter.push(event.data)
+            inquirer_control.follow_filter()
+
+    @manager.registry.add_binding(Keys.Backspace, filter=filtering,
+                                  eager=True)
+    def erase_filter(event):
+        choice_filter.pop()
+        inquirer_control.follow_filter()
+
+    @manager.registry.add_binding(Keys.Escape, eager=True)
+    def clear_filter(event):
+        choice_filter.clear()
+        inquirer_control.follow_filter()
 
     @manager.registry.add_binding(Keys.Down, eager=True)
     def move_cursor_down(event):
-        def _next():
-            inquirer_control.pointer_index = \
-                ((inquirer_control.pointer_index + 1) %
-                 inquirer_control.line_count)
-        _next()
-        while isinstance(inquirer_control.choices[
-            inquirer_control.pointer_index], Separator) or \
-                inquirer_control.choices[inquirer_control.pointer_index][2]:
-            _next()
+        inquirer_control.move_pointer(1)
 
     @manager.registry.add_binding(Keys.Up, eager=True)
     def move_cursor_up(event):
-        def _prev():
-            inquirer_control.pointer_index = \
-                ((inquirer_control.pointer_index - 1) %
-                 inquirer_control.line_count)
-        _prev()
-        while isinstance(inquirer_control.choices[
-            inquirer_control.pointer_index], Separator) or \
-                inquirer_control.choices[inquirer_control.pointer_index][2]:
-            _prev()
+        inquirer_control.move_pointer(-1)
 
     @manager.registry.add_binding(Keys.Enter, eager=True)
     def set_answer(event):
+        if choice_filter.filtering:
+            # Enter ends the typing, the choices stay filtered.
+            choice_filter.filtering = False
+            return
         inquirer_control.answered = True
         event.cli.set_return_value(inquirer_control)
 
@@ -17,6 +17,7 @@
 
 import os
 import importlib
+from bisect import bisect_left
 try:
     from queue import Queue
 except ImportError:
@@ -92,45 +93,87 @@ def get_deps(platform_json):
     return subsystem_dict, component_deps, component_targets, component_dirs
 
 
-def select_node(node, selected, nodes_from, deps):
-    queue = Queue()
-    queue.put(node)
-    nodes_from[node].append(node)
-
-    while not queue.empty():
-        now_node = queue.get()
-        if now_node not in selected:
-            selected.append(now_node)
-        for dep in deps.get(now_node, []):
-            if now_node != dep and dep not in selected:
-                queue.put(dep)
-            nodes_from[dep].append(node)
+class Selection():
+    """Nodes selected in a deps graph, with the deps they pull in.
+
+    A node selected by the user is a root, every node a root reaches
+    through deps is selected too and counts the roots reaching it.
+    Deselecting a node drops the roots reaching it and the nodes left
+    without a root, so select and deselect cost the size of the subgraph
+    they change instead of the size of the graph.
+    """
+    def __init__(self, deps):
+        self._deps = deps
+        self._dependents = defaultdict(set)
+        for node, node_deps in deps.items():
+            for dep in node_deps:
+                if dep != node:
+                    self._dependents[dep].add(node)
+        self.roots = set()
+        # Selected node -> count of the roots reaching it, in select order.
+        self._refs = {}
+
+    def __contains__(self, node):
+        return node in self._refs
+
+    def __iter__(self):
+        return iter(self._refs)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def _closure(self, node):
+        visited = {node}
+        stack = [node]
+        while stack:
+            for dep in self._deps.get(stack.pop(), ()):
+                if dep not in visited:
+                    visited.add(dep)
+                    stack.append(dep)
+        return visited
+
+    def select(self, node):
+        if node in self.roots:
+            return
+        self.roots.add(node)
+        for each_node in self._closure(node):
+            self._refs[each_node] = self._refs.get(each_node, 0) + 1
+
+    def deselect(self, node):
+        if node not in self._refs:
+            return
+        # Nodes between a root and node are selected, the roots reaching
+        # node are found walking up from it through selected nodes only.
+        visited = {node}
+        stack = [node]
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), ()):
+                if dependent in self._refs and dependent not in visited:
+                    visited.add(dependent)
+                    stack.append(dependent)
+        for root in visited & self.roots:
+            self.roots.remove(root)
+            for each_node in self._closure(root):
+                refs = self._refs[each_node] - 1
+                if refs:
+                    self._refs[each_node] = refs
+                else:
+                    del self._refs[each_node]
+
+    def toggle(self, node):
+        if node in self._refs:
+            self.deselect(node)
+        else:
+            self.select(node)
 
+    def clear(self):
+        self.roots.clear()
+        self._refs.clear()
 
-def deselect_node(node, selected, nodes_from, deps):
-    queue = Queue()
-    queue.put(node)
-    node_list = []
-
-    while not queue.empty():
-        now_node = queue.get()
-        for each_node in nodes_from[now_node]:
-            queue.put(each_node)
-        nodes_from[now_node].clear()
-        if now_node in selected:
-            selected.remove(now_node)
-            node_list.append(now_node)
-
-    [queue.put(n) for n in node_list]
-    while not queue.empty():
-        now_node = queue.get()
-        for dep in deps.get(now_node, []):
-            if dep not in selected:
-                continue
-            nodes_from[dep] = [n for n in nodes_from[dep] if n in selected]
-            if not len(nodes_from[dep]):
-                selected.remove(dep)
-                queue.put(dep)
+    def reset(self, nodes):
+        self.clear()
+        for node in nodes:
+            self.select(node)
 
 
 def get_deps_list(comp, deps):
@@ -184,6 +227,55 @@ def check_path(dep, path):
     return False
 
 
+class PathIndex():
+    """Longest prefix lookup of paths, one dict level per path segment.
+
+    Answers like a check_path scan over all the paths, in time bound by
+    the depth of the looked up path instead of the path count. Unlike
+    the scan, which took the first path in dict order, a dep under
+    nested paths, eg: foo and foo/bar, goes to the longest of them.
+    """
+    def __init__(self, fields=None):
+        # A node is [children, value of its path, first value below it].
+        self._root = [{}, None, None]
+        for path, value in (fields or {}).items():
+            self.add(path, value)
+
+    def add(self, path, value):
+        node = self._root
+        for segment in path.split('/'):
+            if not segment:
+                continue
+            if node[2] is None:
+                node[2] = value
+            node = node[0].setdefault(segment, [{}, None, None])
+        node[1] = value
+        if node[2] is None:
+            node[2] = value
+
+    def lookup(self, dep):
+        """Return the value of the longest path which is dep or holds it.
+
+        A directory dep holding no path, eg: //foo when //foo/bar is
+        added, gets the first value added below it, None if there is none.
+        """
+        # //foo:bar(//toolchain:name) -> //foo
+        path, is_label, _ = dep.split('(')[0].partition(':')
+        node = self._root
+        found = None
+        for segment in path.split('/'):
+            if not segment:
+                continue
+            node = node[0].get(segment)
+            if node is None:
+                return found
+            if node[1] is not None:
+                found = node[1]
+        if found is None and not is_label and node is not self._root:
+            return node[2]
+        return found
+
+
 class Separator(object):
     line = '-' * 15
 
@@ -193,3 +285,85 @@ class Separator(object):
 
     def __str__(self):
         return self.line
+
+
+class ChoiceFilter():
+    """Indices of the choices whose name holds the typed text.
+
+    A typed character narrows the matches of the text before it and
+    backspace goes back to them, neither scans all the choices again.
+    """
+    def __init__(self, names):
+        """names of the choices, None for the separators."""
+        self._names = [name.lower() if name is not None else None
+                       for name in names]
+        self.text = ''
+        self.filtering = False
+        self._matches = [list(range(len(names)))]
+
+    @property
+    def matches(self):
+        return self._matches[-1]
+
+    def shows(self, index):
+        matches = self.matches
+        row = bisect_left(matches, index)
+        return row < len(matches) and matches[row] == index
+
+    def push(self, char):
+        self.text += char
+        text = self.text.lower()
+        names = self._names
+        self._matches.append([index for index in self.matches
+                              if names[index] is not None and
+                              text in names[index]])
+
+    def pop(self):
+        if self.text:
+            self.text = self.text[:-1]
+            self._matches.pop()
+
+    def clear(self):
+        self.text = ''
+        self.filtering = False
+        del self._matches[1:]
+
+
+def next_row(rows, index, step, enabled):
+    """Return the index step rows away in rows, skipping disabled ones.
+
+    rows are choice indices in ascending order, index need not be one of
+    them. Return None when no row is enabled.
+    """
+    if not rows:
+        return None
+    row = bisect_left(rows, index)
+    # From an index not in rows, the next row down is the one at row.
+    if row < len(rows) and rows[row] == index or step < 0:
+        row += step
+    for _ in range(len(rows)):
+        row %= len(rows)
+        if enabled(rows[row]):
+            return rows[row]
+        row += step
+    return None
+
+
+class Viewport():
+    """The rows of a choice list the terminal has room for.
+
+    Only these rows are rendered, the first one moves just enough to
+    keep the pointer in view with a row of context around it.
+    """
+    def __init__(self, reserved_rows=2):
+        self.top = 0
+        self._reserved_rows = reserved_rows
+
+    def visible(self, cli, rows, pointer):
+        """rows are choice indices in ascending order, pointer is one."""
+        height = max(3, cli.output.get_size().rows - self._reserved_rows)
+        pointer_row = bisect_left(rows, pointer)
+        top = min(self.top, max(0, pointer_row - 1))
+        top = max(top, pointer_row + 2 - height)
+        self.top = max(0, min(top, len(rows) - height))
+        return rows[self.top:self.top + height]
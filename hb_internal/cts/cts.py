@@ -20,7 +20,6 @@ import os
 import json
 import shutil
 from subprocess import check_output
-from subprocess import CalledProcessError
 try:
     from queue import Queue
 except ImportError:
@@ -29,7 +28,8 @@ from collections import defaultdict
 
 from hb_internal import CONFIG_JSON
 from hb_internal.common.utils import read_json_file
-from hb_internal.cts.common import check_path
+from hb_internal.common.utils import dump_json_file
+from hb_internal.cts.common import PathIndex
 from hb_internal.common.utils import get_project_path
 from hb_internal.common.utils import hb_info
 from hb_internal.common.utils import hb_warning
@@ -43,6 +43,7 @@ class CTS():
         self.kernel_of_board = defaultdict(list)
         self._set_path()
         self.fields = defaultdict(list)
+        self.fields_index = PathIndex()
         self.comp_fields = defaultdict(list)
 
     def __iter__(self):
@@ -112,12 +113,13 @@ class CTS():
         for subsystem in subsystem_list:
             sname = subsystem.replace('.json', '')
             spath = os.path.join(self._components_path, subsystem)
-            scontent = read_json_file(spath)
+            scontent = read_json_file(spath, cache=False)
             subsystem_cls = Subsystem(sname, scontent, spath)
             self.subsystems.append(subsystem_cls)
             for cname, component in subsystem_cls:
                 for fpath in component.dirs:
                     self.fields[fpath] = cname
+                    self.fields_index.add(fpath, cname)
                     self.comp_fields[cname].append(fpath)
 
     def update_special_deps(self):
@@ -201,16 +203,17 @@ class Subsystem():
             self.comps[cname] = (Component(cname, component_json))
 
     def update_json(self):
-        component_list = self.json_content.get('components', [])
-        for index, component in enumerate(component_list):
+        # json_content is a read-only view of the parsed file.
+        component_list = []
+        for component in self.json_content.get('components', []):
             cname = component.get('component', '')
             component_cls = self.comps.get(cname, None)
-            component_list[index]['deps'] = component_cls.get_real_deps()
+            component_list.append(
+                dict(component, deps=component_cls.get_real_deps()))
 
-        self.json_content['components'] = component_list
-        with open(self.json_path, 'wt', encoding='utf-8') as file:
-            json.dump(self.json_content, file,
-                      ensure_ascii=False, indent=2)
+        self.json_content = dict(self.json_content,
+                                 components=component_list)
+        dump_json_file(self.json_path, self.json_content)
 
 
 class Component():
@@ -319,50 +322,34 @@ class Component():
         return ret
 
     def get_component_deps(self, out_file, now_target, comp_fields):
-        include_list = []
+        desc = GnDesc.load(out_file)
+        now_target = GnDesc.label(now_target)
         include_dirs_list = [now_target]
         deps_list = []
 
-        ret = self.gn_desc(out_file, now_target, 'deps', '--tree')
-        hb_info(f'target: {now_target} cmd: deps --tree')
-        hb_info(ret)
-
-        ret_content = [line for line in ret.split('\n')
-                       if len(line) and '\n' not in line]
+        # Walk the deps of now_target, the deps of targets which are part
+        # of the current comp are walked too.
+        visited = {now_target}
+        stack = [now_target]
+        while stack:
+            for dep in desc.deps(stack.pop()):
+                if dep in visited:
+                    continue
+                visited.add(dep)
+                for path in comp_fields[self.name]:
+                    if path in dep:
+                        include_dirs_list.append(dep)
+                        stack.append(dep)
+                        break
+                else:
+                    deps_list.append(dep.replace('//', ''))
 
-        index = 0
-        while index < len(ret_content):  # get deps of the now_target
-            cur_line = ret_content[index]
-            if '...' in cur_line:  # cur_line already exists.
-                index += 1
-                continue
-            space_now = cur_line.count(' ')
-            for path in comp_fields[self.name]:
-                # cur_line is part of current comp,
-                # needs to be further processed.
-                if path in cur_line:
-                    index += 1
-                    include_dirs_list.append(cur_line.replace(' ', ''))
-                    break
-            else:
-                deps_list.append(cur_line.replace(' ', '').replace('//', ''))
-                index += 1
-                while index < len(ret_content) and \
-                        ret_content[index].count(' ') > space_now:
-                    index += 1
-        for target in include_dirs_list:
-            try:
-                ret = self.gn_desc(out_file, target, 'include_dirs')
-                hb_info(f'target: {now_target} cmd: include_dirs')
-                hb_info(ret)
-                include_list += [include.replace('//', '')
-                                 for include in ret.split('\n')
-                                 if '\n' not in include and len(include)]
-            except CalledProcessError:
-                pass
+        include_list = [include.replace('//', '')
+                        for target in include_dirs_list
+                        for include in desc.include_dirs(target)]
         return deps_list, include_list
 
-    def get_deps(self, board, kernel, out_file, comp_fields, fields):
+    def get_deps(self, board, kernel, out_file, comp_fields, fields_index):
         deps_list = []
         include_list = []
         for now_target in self.targets:
@@ -378,24 +365,20 @@ class Component():
         for dep in deps_ori:
             if 'prebuilts' in dep or 'build/lite' in dep:
                 continue
-            for path in comp_fields[self.name]:
-                if dep in path or path in dep:
-                    break
+            cname = fields_index.lookup(dep)
+            if cname is not None and 'hdf' in cname:
+                # special processing for hdf
+                cname = 'hdf_{}_{}'.format(board, kernel)
+            if cname == self.name:
+                continue
+            if cname is not None:
+                comp_deps_set.add(cname)
+            # special processing for third_party
+            elif dep.startswith('third_party'):
+                strlist = dep.split('/')[1].split(':')[0].lower()
+                self.thirdparty_set.add(strlist.replace('-', '_'))
             else:
-                for path, cname in fields.items():
-                    if check_path(dep, path):
-                        if 'hdf' in cname:  # special processing for hdf
-                            cname = 'hdf_{}_{}'.format(board, kernel)
-                        if cname != self.name:
-                            comp_deps_set.add(cname)
-                        break
-                else:
-                    # special processing for third_party
-                    if dep.startswith('third_party'):
-                        strlist = dep.split('/')[1].split(':')[0].lower()
-                        self.thirdparty_set.add(strlist.replace('-', '_'))
-                    else:
-                        comp_deps_set.add(dep)
+                comp_deps_set.add(dep)
         self.deps_dict[(board, kernel)] = comp_deps_set
 
     def get_real_deps(self):
@@ -473,3 +456,56 @@ class Component():
         }
 
         return self.deps_real_dict
+
+
+class GnDesc():
+    """Deps and include_dirs of all the targets of an out dir.
+
+    Every gn desc run loads the whole build graph, so each field is asked
+    for all the targets by one run and the answers are kept for the out
+    dir until gn gen writes it again. Only these two fields are asked,
+    all the fields of all the targets take hundreds of MB.
+    """
+    _cache = {}
+
+    def __init__(self, deps, include_dirs):
+        self._deps = deps
+        self._include_dirs = include_dirs
+
+    @classmethod
+    def load(cls, out_file):
+        build_ninja = os.path.join(out_file, 'build.ninja')
+        try:
+            mtime = os.stat(build_ninja).st_mtime_ns
+        except OSError:
+            mtime = None
+        key = os.path.abspath(out_file)
+        cached = cls._cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        desc = cls(cls._desc_field(out_file, 'deps'),
+                   cls._desc_field(out_file, 'include_dirs'))
+        hb_info(f'{out_file}: gn desc of all targets done')
+        cls._cache[key] = (mtime, desc)
+        return desc
+
+    @staticmethod
+    def _desc_field(out_file, field):
+        """Return a dict mapping every target to its field."""
+        ret = Component.gn_desc(out_file, '//*', field, '--format=json')
+        return {target: desc.get(field, [])
+                for target, desc in json.loads(ret).items()}
+
+    @staticmethod
+    def label(target):
+        """Return target as gn labels it, eg: //foo/bar -> //foo/bar:bar."""
+        if ':' in target.split('(')[0]:
+            return target
+        return '{}:{}'.format(target, target.rstrip('/').split('/')[-1])
+
+    def deps(self, target):
+        return self._deps.get(target, [])
+
+    def include_dirs(self, target):
+        return self._include_dirs.get(target, [])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+from hb_internal.common.config import Config
+from hb_internal.common.utils import hb_info
+from hb_internal.common.utils import hb_error
+from hb_internal.common.utils import hb_warning
+from hb_internal.common.utils import OHOSException
+from hb_internal.build.build_process import Build
+from hb_internal.build.multi_product_build import parse_products
+from hb_internal.cts.cts import CTS
+from hb_internal.set.set import set_product
+
+
+def _set_product(product, company):
+    config = Config.isolated()
+    set_product(product_name=product, company=company, config=config)
+    return config
+
+
+def configuration_deps(product, company):
+    """gn gen the product and compute the deps of its components.
+
+    Run in a worker process. Return board, kernel and a dict mapping the
+    components adapted to them to their deps and third party deps.
+    """
+    config = _set_product(product, company)
+    cmd_args = defaultdict(list)
+    cmd_args['ninja'] = {}
+    cmd_args['disable_post_build'] = True
+    Build(config=config).build(False, ninja=False, cmd_args=cmd_args)
+
+    board, kernel = config.board, config.kernel
+    cts = CTS()
+    cts.init_from_json()
+    deps = {}
+    for subsystem_cls in cts:
+        for cname, component_cls in subsystem_cls:
+            if not component_cls.is_board_in_comp(board):
+                continue
+            if not component_cls.is_kernel_in_comp(kernel):
+                continue
+            component_cls.get_deps(board, kernel, config.out_path,
+                                   cts.comp_fields, cts.fields_index)
+            deps[cname] = (component_cls.deps_dict[(board, kernel)],
+                           component_cls.thirdparty_set)
+    return board, kernel, deps
+
+
+class DepsMatrix():
+    """Compute the deps of the components for several products at once.
+
+    Every (board, kernel) of the products is one configuration, generated
+    in its own out dir and analyzed in a process of its own. The deps of
+    a configuration are merged into the components as soon as it is done,
+    get_real_deps then splits them into common and special deps.
+    """
+    def __init__(self, products, max_workers=None):
+        self._products = parse_products(products)
+        self._max_workers = max_workers
+
+    def _configurations(self):
+        configurations = {}
+        out_paths = {}
+        # Product lookup shares the product index, keep it in this process.
+        for product, company in self._products:
+            config = _set_product(product, company)
+            key = (config.board, config.kernel)
+            if key in configurations:
+                hb_warning(f'{product} has the board and kernel of '
+                           f'{configurations[key][0]}, skipped')
+                continue
+            out_path = os.path.abspath(config.out_path)
+            if out_path in out_paths:
+                raise OHOSException(
+                    f'{product} and {out_paths[out_path]} are both '
+                    f'generated in {out_path}')
+            out_paths[out_path] = product
+            configurations[key] = (product, company)
+        return configurations
+
+    def run(self, cts):
+        """Merge the deps of every configuration into the cts components."""
+        configurations = self._configurations()
+        components = {cname: component_cls
+                      for subsystem_cls in cts
+                      for cname, component_cls in subsystem_cls}
+        max_workers = self._max_workers or \
+            min(len(configurations), os.cpu_count() or 1)
+        hb_info(f'analyzing {len(configurations)} configurations, '
+                f'{max_workers} at a time')
+
+        failed = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(configuration_deps, *product): key
+                       for key, product in configurations.items()}
+            for future in as_completed(futures):
+                board, kernel = futures[future]
+                try:
+                    _, _, deps = future.result()
+                except Exception as exception:
+                    failed.append(f'{board}/{kernel}')
+                    hb_error(f'{board}/{kernel}: {exception}')
+                    continue
+                for cname, (comp_deps, thirdparty) in deps.items():
+                    component_cls = components.get(cname)
+                    if component_cls is None:
+                        continue
+                    component_cls.deps_dict[(board, kernel)] = comp_deps
+                    component_cls.thirdparty_set |= thirdparty
+                hb_info(f'{board}/{kernel}: {len(deps)} components done')
+
+        if failed:
+            raise OHOSException(f'failed to analyze {", ".join(failed)}')
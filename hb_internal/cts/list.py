@@ -32,6 +32,9 @@ from prompt_toolkit.token import Token
 from hb_internal.cts.common import Separator
 from hb_internal.cts.common import if_mousedown
 from hb_internal.cts.common import get_style
+from hb_internal.cts.common import ChoiceFilter
+from hb_internal.cts.common import Viewport
+from hb_internal.cts.common import next_row
 from hb_internal.common.utils import OHOSException
 
 
@@ -41,6 +44,11 @@ class InquirerControl(TokenListControl):
         self.answered = False
         self.choices = choices
         self._init_choices(choices)
+        self.choice_filter = ChoiceFilter(
+            [None if isinstance(choice[0], Separator) else str(choice[0])
+             for choice in self.choices])
+        self.viewport = Viewport()
+        self._row_tokens = {}  # index -> (row state, tokens)
         super(InquirerControl, self).__init__(self._get_choice_tokens,
                                               **kwargs)
 
@@ -68,44 +76,68 @@ class InquirerControl(TokenListControl):
     def choice_count(self):
         return len(self.choices)
 
+    def is_enabled(self, index):
+        choice = self.choices[index]
+        return not isinstance(choice[0], Separator) and not choice[2]
+
+    def move_pointer(self, step):
+        index = next_row(self.choice_filter.matches,
+                         self.selected_option_index, step, self.is_enabled)
+        if index is not None:
+            self.selected_option_index = index
+
+    def follow_filter(self):
+        # Keep the pointer on a choice the filter shows.
+        if not self.choice_filter.shows(self.selected_option_index):
+            self.move_pointer(1)
+
     def _get_choice_tokens(self, cli):
+        # Only the rows on screen are rendered, a row is rebuilt when it
+        # gets or loses the pointer.
         tokens = []
-        token = Token
-
-        def append(index, choice):
+        for index in self.viewport.visible(cli, self.choice_filter.matches,
+                                           self.selected_option_index):
             selected = (index == self.selected_option_index)
+            cached = self._row_tokens.get(index)
+            if cached is None or cached[0] != selected:
+                cached = self._row_tokens[index] = (
+                    selected, self._get_row_tokens(index, selected))
+            tokens.extend(cached[1])
+        if tokens:
+            tokens.pop()  # Remove last newline.
+        return tokens
 
-            @if_mousedown
-            def select_item(cli, mouse_event):
-                # bind option with this index to mouse event
-                self.selected_option_index = index
-                self.answered = True
-
-            tokens.append((token.Pointer if selected else token, ' \u276f '
-                          if selected else '   '))
-            if selected:
-                tokens.append((Token.SetCursorPosition, ''))
-            if choice[2]:  # disabled
-                tokens.append((token.Selected if selected else token,
-                               '- %s (%s)' % (choice[0], choice[2])))
+    def _get_row_tokens(self, index, selected):
+        tokens = []
+        token = Token
+        choice = self.choices[index]
+
+        @if_mousedown
+        def select_item(cli, mouse_event):
+            # bind option with this index to mouse event
+            self.selected_option_index = index
+            self.answered = True
+
+        tokens.append((token.Pointer if selected else token, ' \u276f '
+                      if selected else '   '))
+        if selected:
+            tokens.append((Token.SetCursorPosition, ''))
+        if choice[2]:  # disabled
+            tokens.append((token.Selected if selected else token,
+                           '- %s (%s)' % (choice[0], choice[2])))
+        else:
+            if isinstance(choice[0], Separator):
+                tokens.append((token.Separator,
+                              str(choice[0]),
+                              select_item))
             else:
-                if isinstance(choice[0], Separator):
-                    tokens.append((token.Separator,
-                                  str(choice[0]),
-                                  select_item))
-                else:
-                    try:
-                        tokens.append((token.Selected if selected else token,
-                                      str(choice[0]), select_item))
-                    except Exception:
-                        tokens.append((token.Selected if selected else
-                                      token, choice[0], select_item))
-            tokens.append((token, '\n'))
-
-        # prepare the select choices
-        for i, choice in enumerate(self.choices):
-            append(i, choice)
-        tokens.pop()  # Remove last newline.
+                try:
+                    tokens.append((token.Selected if selected else token,
+                                  str(choice[0]), select_item))
+                except Exception:
+                    tokens.append((token.Selected if selected else
+                                  token, choice[0], select_item))
+        tokens.append((token, '\n'))
         return tokens
 
     def get_selection(self):
@@ -121,6 +153,7 @@ def question(message, **kwargs):
     style = kwargs.pop('style', get_style('terminal'))
 
     inquirer_control = InquirerControl(choices)
+    choice_filter = inquirer_control.choice_filter
 
     def get_prompt_tokens(cli):
         tokens = []
@@ -130,8 +163,11 @@ def question(message, **kwargs):
         if inquirer_control.answered:
             tokens.append((Token.Answer, ' ' +
                           inquirer_control.get_selection()[0]))
+        elif choice_filter.text:
+            tokens.append((Token.Instruction, ' /%s' % choice_filter.text))
         else:
-            tokens.append((Token.Instruction, ' (Use arrow keys)'))
+            tokens.append((Token.Instruction,
+                           ' (Use arrow keys, type to filter)'))
         return tokens
 
     # assemble layout
@@ -154,32 +190,32 @@ def question(message, **kwargs):
 
     @manager.registry.add_binding(Keys.Down, eager=True)
     def move_cursor_down(event):
-        def _next():
-            inquirer_control.selected_option_index = (
-                (inquirer_control.selected_option_index + 1) %
-                inquirer_control.choice_count)
-        _next()
-        while isinstance(inquirer_control.choices[
-            inquirer_control.selected_option_index][0], Separator) \
-                or inquirer_control.choices[
-                    inquirer_control.selected_option_index][2]:
-            _next()
+        inquirer_control.move_pointer(1)
 
     @manager.registry.add_binding(Keys.Up, eager=True)
     def move_cursor_up(event):
-        def _prev():
-            inquirer_control.selected_option_index = (
-                (inquirer_control.selected_option_index - 1) %
-                inquirer_control.choice_count)
-        _prev()
-        while isinstance(inquirer_control.choices[
-            inquirer_control.selected_option_index][0], Separator) \
-                or inquirer_control.choices[
-                    inquirer_control.selected_option_index][2]:
-            _prev()
+        inquirer_control.move_pointer(-1)
+
+    @manager.registry.add_binding(Keys.Any, eager=True)
+    def type_filter(event):
+        if event.data.isprintable():
+            choice_filter.push(event.data)
+            inquirer_control.follow_filter()
+
+    @manager.registry.add_binding(Keys.Backspace, eager=True)
+    def erase_filter(event):
+        choice_filter.pop()
+        inquirer_control.follow_filter()
+
+    @manager.registry.add_binding(Keys.Escape, eager=True)
+    def clear_filter(event):
+        choice_filter.clear()
+        inquirer_control.follow_filter()
 
     @manager.registry.add_binding(Keys.Enter, eager=True)
     def set_answer(event):
+        if not choice_filter.shows(inquirer_control.selected_option_index):
+            return
         inquirer_control.answered = True
         event.cli.set_return_value(inquirer_control.get_selection())
 
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+from datetime import datetime
+
+from hb_internal.common.config import Config
+from hb_internal.common.utils import hb_info
+from hb_internal.common.utils import OHOSException
+from hb_internal.build.build_history import BuildHistory
+from hb_internal.build.build_history import get_history_db
+
+
+def add_options(parser):
+    parser.add_argument('--regressions',
+                        action='store_true',
+                        default=False,
+                        help='list phases, actions and images of a build '
+                        'which regressed against the previous builds')
+    parser.add_argument('--build',
+                        type=int,
+                        default=None,
+                        help='build id to check, default is the latest build')
+    parser.add_argument('--product',
+                        default=None,
+                        help='only list builds of this product')
+    parser.add_argument('--window',
+                        type=int,
+                        default=5,
+                        help='number of previous successful builds whose '
+                        'median is the baseline')
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.2,
+                        help='relative growth reported as a regression, '
+                        'eg: 0.2 for 20%%')
+    parser.add_argument('--min-delta',
+                        type=float,
+                        default=1.0,
+                        help='ignore growth below this many seconds '
+                        '(KB for images)')
+    parser.add_argument('--top',
+                        type=int,
+                        default=20,
+                        help='number of builds or regressions to list')
+
+
+def exec_command(args):
+    db_path = get_history_db(Config().root_path)
+    if not os.path.isfile(db_path):
+        raise OHOSException(f'{db_path} not found, please build first')
+    history = BuildHistory(db_path)
+    try:
+        if args.regressions:
+            show_regressions(history, args)
+        else:
+            show_builds(history, args)
+    finally:
+        history.close()
+    return 0
+
+
+def show_builds(history, args):
+    for build_id, product, start_time, total_time, status, hit_rate in \
+            history.get_builds(args.product, args.top):
+        start = datetime.fromtimestamp(start_time).strftime(
+            '%Y-%m-%d %H:%M:%S')
+        hit_rate = '-' if hit_rate is None else f'{hit_rate:.1%}'
+        hb_info(f'{build_id:>6} {start} {product:<20} {status:<8} '
+                f'{total_time:8.1f}s ccache {hit_rate}')
+
+
+def show_regressions(history, args):
+    regressions = history.get_regressions(args.build,
+                                          window=args.window,
+                                          threshold=args.threshold,
+                                          min_delta=args.min_delta)
+    if not regressions:
+        hb_info('no regression found')
+        return
+    for kind, name, value, baseline in regressions[:args.top]:
+        unit = 'KB' if kind == 'image' else 's'
+        growth = (value - baseline) / baseline if baseline else float('inf')
+        hb_info(f'{kind:<6} {name}: {baseline:.1f}{unit} -> '
+                f'{value:.1f}{unit} (+{growth:.0%})')
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2022 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import hashlib
+
+TREE_PREFIX = 'tree:'
+
+
+def _hash_input(path):
+    # A missing input is recorded too, its appearance changes the result,
+    # for a directory only its existence matters.
+    if os.path.isdir(path):
+        return 'dir'
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as input_file:
+        return hashlib.sha256(input_file.read()).hexdigest()
+
+
+def _hash_tree(path):
+    names = sorted(os.path.relpath(os.path.join(root, file), path)
+                   for root, _, files in os.walk(path) for file in files)
+    return TREE_PREFIX + hashlib.sha256(
+        '\n'.join(names).encode('utf-8')).hexdigest()
+
+
+class InputManifest():
+    """Content hashes of the files a preloader run depended on.
+
+    params holds everything else the outputs depend on, eg: the product
+    name or the target cpu given on the command line.
+    """
+    def __init__(self, manifest_file, params):
+        self._manifest_file = manifest_file
+        self._params = params
+        self._inputs = {}
+
+    def add(self, path):
+        if path not in self._inputs:
+            self._inputs[path] = _hash_input(path)
+
+    def add_tree(self, path):
+        """Add every file under path, and the list of them."""
+        self._inputs[path] = _hash_tree(path)
+        for root, _, files in os.walk(path):
+            for file in files:
+                self.add(os.path.join(root, file))
+
+    def is_fresh(self):
+        try:
+            with open(self._manifest_file, 'rt',
+                      encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return False
+        if manifest.get('params') != self._params:
+            return False
+        for path, digest in manifest.get('inputs', {}).items():
+            if digest is not None and digest.startswith(TREE_PREFIX):
+                if _hash_tree(path) != digest:
+                    return False
+            elif _hash_input(path) != digest:
+                return False
+        return True
+
+    def invalidate(self):
+        if os.path.exists(self._manifest_file):
+            os.remove(self._manifest_file)
+
+    def save(self):
+        with open(self._manifest_file, 'wt',
+                  encoding='utf-8') as manifest_file:
+            json.dump({'params': self._params, 'inputs': self._inputs},
+                      manifest_file, indent=2, sort_keys=True)
@@ -17,45 +17,44 @@ import json
 import os
 
 from hb_internal.common.utils import read_json_file
+from hb_internal.common.utils import write_file_if_changed
 
 
 def _read_lite_component_configs(file):
     subsystem_name = os.path.basename(file)[:-5]
     configs = {}
     configs['subsystem_name'] = subsystem_name
-    with open(file, 'rb') as fin:
-        data = json.load(fin)
-        components = data.get('components')
-        parts = {}
-        for com in components:
-            part = {}
-            targets = com.get('targets')
-            test_targets = []
-            non_test_targets = []
-            for item in targets:
-                target_names = item.strip('"').split(':')
-                if len(target_names) > 1 and 'test' in target_names[1]:
-                    test_targets.append(item)
-                else:
-                    non_test_targets.append(item)
-            part['module_list'] = non_test_targets
-            if test_targets != []:
-                part['test_list'] = test_targets
-            part_name = com.get('component')
-            parts[part_name] = part
-        configs['parts'] = parts
+    data = read_json_file(file)
+    components = data.get('components')
+    parts = {}
+    for com in components:
+        part = {}
+        targets = com.get('targets')
+        test_targets = []
+        non_test_targets = []
+        for item in targets:
+            target_names = item.strip('"').split(':')
+            if len(target_names) > 1 and 'test' in target_names[1]:
+                test_targets.append(item)
+            else:
+                non_test_targets.append(item)
+        part['module_list'] = non_test_targets
+        if test_targets != []:
+            part['test_list'] = test_targets
+        part_name = com.get('component')
+        parts[part_name] = part
+    configs['parts'] = parts
     return configs
 
 
 def _save_as_ohos_build(config, ohos_build):
     new_config = json.dumps(config, indent=2, sort_keys=True)
-    with open(ohos_build, 'w') as fout:
-        fout.write(new_config)
+    write_file_if_changed(ohos_build, new_config)
 
 
 def parse_lite_subsystem_config(lite_components_dir, output_dir,
                                 source_root_dir, subsystem_config_file):
-    subsystem_infos = read_json_file(subsystem_config_file)
+    subsystem_infos = dict(read_json_file(subsystem_config_file))
     for root, _, files in os.walk(lite_components_dir):
         for file in files:
             if file[-5:] == '.json':
@@ -106,6 +106,8 @@ def from_ss_to_parts(subsystems):
 
 
 def transform(config):
+    # config may be a read-only view of a parsed file.
+    config = dict(config)
     subsystems = config.get('subsystems')
     if subsystems:
         config.pop('subsystems')
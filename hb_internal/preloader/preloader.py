@@ -16,6 +16,7 @@
 from dataclasses import dataclass
 import os
 import sys
+import json
 import argparse
 
 sys.path.append(
@@ -23,9 +24,22 @@ sys.path.append(
         os.path.abspath(__file__)))))
 from hb_internal.common.config import Config
 from hb_internal.common.utils import read_json_file
-from hb_internal.common.utils import dump_json_file
+from hb_internal.common.utils import write_file_if_changed
+from hb_internal.common.utils import hb_info
+from hb_internal.preloader import parse_lite_subsystems_config
+from hb_internal.preloader import parse_vendor_product_config
 from hb_internal.preloader.parse_lite_subsystems_config import parse_lite_subsystem_config
 from hb_internal.preloader.parse_vendor_product_config import get_vendor_parts_list
+from hb_internal.preloader.input_manifest import InputManifest
+
+PRELOADER_MANIFEST = '.preloader_manifest.json'
+
+
+def dump_json_file(dump_file, json_data):
+    # Outputs are only rewritten when their content changed, so gn and
+    # ninja see a stable tree.
+    write_file_if_changed(dump_file,
+                          json.dumps(json_data, ensure_ascii=False, indent=2))
 
 
 def _get_base_parts(base_config_dir, os_level):
@@ -69,7 +83,7 @@ def _get_device_info(device_name, config_dir):
     if device_info and device_info.get('device_name') != device_name:
         raise Exception("device name configuration incorrect in '{}'".format(
             device_config_file))
-    return device_info
+    return dict(device_info)
 
 
 def _output_platforms_config(target_os, target_cpu, toolchain_label,
@@ -87,14 +101,13 @@ def _output_platforms_config(target_os, target_cpu, toolchain_label,
 
 def _output_gnargs_prop(all_features, output_file):
     features_list = _part_features_to_list(all_features)
-    with open(output_file, 'w') as fobj:
-        fobj.write('\n'.join(features_list))
+    write_file_if_changed(output_file, '\n'.join(features_list))
 
 
 def _get_org_subsystem_info(subsystem_config_file, os_level, config_dirs):
     subsystem_info = {}
     if os_level == "standard":
-        subsystem_info = read_json_file(subsystem_config_file)
+        subsystem_info = dict(read_json_file(subsystem_config_file))
     elif os_level == "mini" or os_level == "small":
         ohos_build_output_dir = os.path.join(config_dirs.preloader_output_dir,
                                              '{}_system'.format(os_level))
@@ -177,8 +190,7 @@ def _output_build_vars(build_vars, build_prop, build_config_json):
     build_vars_list = []
     for k, v in build_vars.items():
         build_vars_list.append('{}={}'.format(k, v))
-    with open(build_prop, 'w') as fobj:
-        fobj.write('\n'.join(build_vars_list))
+    write_file_if_changed(build_prop, '\n'.join(build_vars_list))
     dump_json_file(build_config_json, build_vars)
 
 
@@ -208,6 +220,8 @@ class MyProduct():
         self._syscap_info = {}
         self._parsed = False
         self._config_file = config_json
+        # Config files read while parsing, see get_inputs.
+        self._inputs = []
 
     def parse_config(self):
         self._do_parse()
@@ -217,6 +231,13 @@ class MyProduct():
         self._do_parse()
         return self._device
 
+    def get_inputs(self):
+        self._do_parse()
+        inputs = list(self._inputs)
+        if self._device:
+            inputs.extend(self._device.get_inputs())
+        return inputs
+
     def get_product_specific_subsystem(self):
         info = {}
         self._do_parse()
@@ -241,7 +262,8 @@ class MyProduct():
 
     def _do_parse(self):
         if self._parsed is False:
-            self._config = read_json_file(self._config_file)
+            self._inputs.append(self._config_file)
+            self._config = dict(read_json_file(self._config_file))
 
             version = self._config.get('version', '3.0')
             product_name = self._config.get('product_name')
@@ -295,6 +317,7 @@ class MyProduct():
             build_vars['build_seccomp'] = config.get('build_seccomp')
         if 'chipprod_config_path' in config:
             chipprod_config_path = os.path.join(self._dirs.source_root_dir, config.get('chipprod_config_path'))
+            self._inputs.append(chipprod_config_path)
             if os.path.exists(chipprod_config_path):
                 build_vars['chipprod_config_path'] = chipprod_config_path
 
@@ -334,6 +357,7 @@ class MyProduct():
             device_build_path = os.path.join(self._dirs.device_dir,
                                              config['device_company'],
                                              config['board'])
+            self._inputs.append(device_build_path)
             if not os.path.exists(device_build_path):
                 device_build_path = os.path.join(self._dirs.device_dir,
                                                  'board',
@@ -377,6 +401,7 @@ class MyProduct():
             build_vars['support_jsapi'] = config.get('support_jsapi')
         if 'chipprod_config_path' in config:
             chipprod_config_path = os.path.join(self._dirs.source_root_dir, config.get('chipprod_config_path'))
+            self._inputs.append(chipprod_config_path)
             if os.path.exists(chipprod_config_path):
                 build_vars['chipprod_config_path'] = chipprod_config_path
 
@@ -412,16 +437,23 @@ class MyProduct():
         # 2. product config based on default minimum system
         based_on_mininum_system = config.get('based_on_mininum_system')
         if based_on_mininum_system == "true":
-            self._parts = _get_base_parts(self._dirs.built_in_base_dir, os_level)
+            self._inputs.append(os.path.join(
+                self._dirs.built_in_base_dir, '{}_system.json'.format(os_level)))
+            self._parts = dict(
+                _get_base_parts(self._dirs.built_in_base_dir, os_level))
         # 3. inherit parts information from inherit config
         inherit = config.get('inherit')
         if inherit:
+            self._inputs.extend(os.path.join(self._dirs.source_root_dir, _config)
+                                for _config in inherit)
             self._parts.update(
                 _get_inherit_parts(inherit, self._dirs.source_root_dir))
 
         # 4. chipset products relate system parts config
         sys_info_path = config.get('system_component')
         if sys_info_path:
+            self._inputs.append(os.path.join(self._dirs.source_root_dir,
+                                             sys_info_path))
             sys_parts = _get_sys_relate_parts(sys_info_path, self._parts, self._dirs.source_root_dir)
             self._parts.update(sys_parts)
 
@@ -441,7 +473,10 @@ class MyDevice():
     def __init__(self, device_name, config_dirs, device_info=None):
         self._name = device_name
         self._dirs = config_dirs
+        self._inputs = []
         if device_info is None:
+            self._inputs.append(os.path.join(self._dirs.built_in_device_dir,
+                                             '{}.json'.format(self._name)))
             self._device_info = _get_device_info(
                 self._name, self._dirs.built_in_device_dir)
         else:
@@ -450,6 +485,9 @@ class MyDevice():
     def get_device_info(self):
         return self._device_info
 
+    def get_inputs(self):
+        return self._inputs
+
     def get_device_specific_parts(self):
         info = {}
         if self._device_info:
@@ -557,10 +595,10 @@ class Preloader():
             self._target_cpu = config.target_cpu
             self._compile_config = config.compile_config
 
-            # Product & Device
+            # Product & Device, parsed on demand by run()
             self._product = MyProduct(config.product, self._dirs,
                                     config.product_json)
-            self._device = self._product.get_device()
+            self._device = None
 
             # All kinds of output files
             os.makedirs(self._dirs.preloader_output_dir, exist_ok=True)
@@ -571,17 +609,59 @@ class Preloader():
             self._target_cpu = config.target_cpu
             self._compile_config = None
 
-            # Product & Device
+            # Product & Device, parsed on demand by run()
             self._product = MyProduct(config.product, self._dirs,
                                     config.product_json)
-            self._device = self._product.get_device()
+            self._device = None
 
             # All kinds of output files
             os.makedirs(self._dirs.preloader_output_dir, exist_ok=True)
             self._outputs = Outputs(self._dirs.preloader_output_dir)
 
 
+    def _get_manifest(self):
+        params = {
+            'product': self._product._name,
+            'product_json': self._product._config_file,
+            'target_cpu': self._target_cpu,
+            'compile_config': self._compile_config,
+            'source_root_dir': self._dirs.source_root_dir,
+            'vendor_dir': self._dirs.vendor_dir,
+            'built_in_product_dir': self._dirs.built_in_product_dir,
+        }
+        return InputManifest(
+            os.path.join(self._dirs.preloader_output_dir, PRELOADER_MANIFEST),
+            params)
+
+    def _add_inputs(self, manifest, os_level):
+        # The preloader itself is an input as well.
+        for module in (sys.modules[__name__], parse_lite_subsystems_config,
+                       parse_vendor_product_config):
+            manifest.add(os.path.abspath(module.__file__))
+        for path in self._product.get_inputs():
+            manifest.add(path)
+        manifest.add(self._dirs.subsystem_config_json)
+        if os_level == 'mini' or os_level == 'small':
+            manifest.add_tree(self._dirs.lite_components_dir)
+
+    def _outputs_exist(self):
+        return all(os.path.isfile(path) for path in (
+            self._outputs.build_prop, self._outputs.build_config_json,
+            self._outputs.parts_json, self._outputs.parts_config_json,
+            self._outputs.build_gnargs_prop, self._outputs.features_json,
+            self._outputs.syscap_json, self._outputs.exclusion_modules_json,
+            self._outputs.subsystem_config_json,
+            self._outputs.platforms_build,
+            self._outputs.systemcapability_json))
+
     def run(self, *args):
+        manifest = self._get_manifest()
+        if self._outputs_exist() and manifest.is_fresh():
+            hb_info('preloader outputs are up to date')
+            return
+        manifest.invalidate()
+
+        self._device = self._product.get_device()
         all_parts, build_vars = self._product.parse_config()
         if self._device:
             device_info = self._device.get_device_info()
@@ -639,6 +719,9 @@ class Preloader():
         _merge_subsystem_config(self._product, self._device, self._dirs,
                                 os_level, self._outputs.subsystem_config_json)
 
+        self._add_inputs(manifest, os_level)
+        manifest.save()
+
 def main(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument('--product', required=True)
@@ -57,7 +57,7 @@ def set_root_path(root_path=None):
     return 0
 
 
-def set_product(product_name=None, company=None):
+def set_product(product_name=None, company=None, config=None):
     if product_name is None and company is None:
         product_info = Product.product_menuconfig()
     elif product_name is None:
@@ -65,64 +65,67 @@ def set_product(product_name=None, company=None):
     else:
         product_info = Product.get_product_info(product_name, company)
 
-    config = Config()
-    config.product = product_info.get('name')
-    config.product_path = product_info.get('product_path')
-    config.version = product_info.get('version')
-    config.os_level = product_info.get('os_level')
-    config.product_json = product_info.get('config')
-    config.component_type = product_info.get('component_type')
-    if product_info.get('product_config_path'):
-        config.product_config_path = product_info.get('product_config_path')
-    else:
-        config.product_config_path = product_info('product_path')
-
-    device_info = Product.get_device_info(config.product_json)
-    config.board = device_info.get('board')
-    config.kernel = device_info.get('kernel')
-    config.target_cpu = device_info.get('target_cpu')
-    config.target_os = device_info.get('target_os')
-    kernel_version = device_info.get('kernel_version')
-    config.device_company = device_info.get('company')
-    board_path = device_info.get('board_path')
-
-    if product_info.get('build_out_path'):
-        config.out_path = os.path.join(config.root_path,
-                                       product_info.get('build_out_path'))
-    else:
-        if config.os_level == 'standard':
-            config.out_path = os.path.join(config.root_path, 'out',
-                                           config.board)
+    if config is None:
+        config = Config()
+    with config.transaction():
+        config.product = product_info.get('name')
+        config.product_path = product_info.get('product_path')
+        config.version = product_info.get('version')
+        config.os_level = product_info.get('os_level')
+        config.product_json = product_info.get('config')
+        config.component_type = product_info.get('component_type')
+        if product_info.get('product_config_path'):
+            config.product_config_path = product_info.get(
+                'product_config_path')
         else:
-            config.out_path = os.path.join(config.root_path, 'out',
-                                           config.board, config.product)
-
-    if product_info.get('subsystem_config_json'):
-        config.subsystem_config_json = product_info.get(
-            'subsystem_config_json')
-    else:
-        config.subsystem_config_json = 'build/subsystem_config.json'
-
-    subsystem_config_overlay_path = config.product_path + '/subsystem_config_overlay.json'
-    if os.path.isfile(subsystem_config_overlay_path):
-        if product_info.get('subsystem_config_overlay_json'):
-            config.subsystem_config_overlay_json = product_info.get(
-                'subsystem_config_overlay_json')
+            config.product_config_path = product_info('product_path')
+
+        device_info = Product.get_device_info(config.product_json)
+        config.board = device_info.get('board')
+        config.kernel = device_info.get('kernel')
+        config.target_cpu = device_info.get('target_cpu')
+        config.target_os = device_info.get('target_os')
+        kernel_version = device_info.get('kernel_version')
+        config.device_company = device_info.get('company')
+        board_path = device_info.get('board_path')
+
+        if product_info.get('build_out_path'):
+            config.out_path = os.path.join(config.root_path,
+                                           product_info.get('build_out_path'))
         else:
-            config.subsystem_config_overlay_json = subsystem_config_overlay_path
+            if config.os_level == 'standard':
+                config.out_path = os.path.join(config.root_path, 'out',
+                                               config.board)
+            else:
+                config.out_path = os.path.join(config.root_path, 'out',
+                                               config.board, config.product)
+
+        if product_info.get('subsystem_config_json'):
+            config.subsystem_config_json = product_info.get(
+                'subsystem_config_json')
+        else:
+            config.subsystem_config_json = 'build/subsystem_config.json'
 
-    if config.version == '2.0':
-        config.device_path = board_path
-    else:
-        if config.os_level == "standard":
+        subsystem_config_overlay_path = config.product_path + '/subsystem_config_overlay.json'
+        if os.path.isfile(subsystem_config_overlay_path):
+            if product_info.get('subsystem_config_overlay_json'):
+                config.subsystem_config_overlay_json = product_info.get(
+                    'subsystem_config_overlay_json')
+            else:
+                config.subsystem_config_overlay_json = subsystem_config_overlay_path
+
+        if config.version == '2.0':
             config.device_path = board_path
         else:
-            config.device_path = Device.get_device_path(
-                board_path, config.kernel, kernel_version)
-
-    if device_info.get('board_config_path'):
-        config.device_config_path = device_info.get('board_config_path')
-    else:
-        config.device_config_path = config.device_path
+            if config.os_level == "standard":
+                config.device_path = board_path
+            else:
+                config.device_path = Device.get_device_path(
+                    board_path, config.kernel, kernel_version)
+
+        if device_info.get('board_config_path'):
+            config.device_config_path = device_info.get('board_config_path')
+        else:
+            config.device_config_path = config.device_path
 
     return 0